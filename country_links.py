@@ -1,7 +1,10 @@
-import requests
+import asyncio
 import csv
-import time
 import os
+import time
+from urllib.parse import quote, urlparse, parse_qs
+import httpx
+import orjson
 from dotenv import load_dotenv
 
 # Load environment variables from .env file if available
@@ -15,23 +18,123 @@ GITHUB_HEADERS = {
     "Accept": "application/vnd.github.v3+json"
 }
 
-def get_github_repos(org):
-    """Fetch all repositories for a GitHub organization."""
-    repos = []
-    page = 1
-    while True:
-        url = f"https://api.github.com/orgs/{org}/repos?per_page=100&page={page}"
-        response = requests.get(url, headers=GITHUB_HEADERS)
+# Maximum number of page requests in flight at once (keeps us under GitHub's secondary rate limit).
+# With HTTP/2 these are multiplexed over a single connection, so the cap is enforced with a semaphore.
+MAX_CONCURRENT_REQUESTS = 10
+REQUEST_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Transient errors are retried with exponential backoff (honouring Retry-After when present)
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_RETRIES = 5
+
+# Epoch time until which requests are paused because the rate limit quota is used up
+rate_limit_resume_at = 0.0
+
+def update_rate_limit(response):
+    """Pause all further requests until the reset time once the API reports no remaining quota.
+       GitHub sends X-RateLimit-*, GitLab sends RateLimit-* headers.
+    """
+    global rate_limit_resume_at
+    remaining = response.headers.get("X-RateLimit-Remaining", response.headers.get("RateLimit-Remaining"))
+    reset = response.headers.get("X-RateLimit-Reset", response.headers.get("RateLimit-Reset"))
+    if remaining == "0" and reset:
+        rate_limit_resume_at = max(rate_limit_resume_at, float(reset))
+
+# Pages are cached on disk with their ETag so re-runs can use conditional requests.
+# A 304 Not Modified costs no body transfer and does not count against GitHub's rate limit.
+HTTP_CACHE_FILE = ".http_cache.json"
+# Response headers needed to rebuild a cached page (pagination info)
+CACHED_HEADERS = ("Link", "X-Total-Pages", "X-Next-Page")
+
+def load_http_cache():
+    """Load the on-disk HTTP cache, or start with an empty one"""
+    try:
+        with open(HTTP_CACHE_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_http_cache():
+    """Persist the HTTP cache for the next run"""
+    with open(HTTP_CACHE_FILE, "wb") as f:
+        f.write(orjson.dumps(HTTP_CACHE))
+
+HTTP_CACHE = load_http_cache()
+
+def create_client(headers):
+    """Create an HTTP/2 client so concurrent page requests share one multiplexed connection."""
+    return httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        limits=httpx.Limits(max_keepalive_connections=20),
+        timeout=30.0
+    )
+
+async def fetch_page(client, url, params=None):
+    """Fetch a single API page and return the response together with its parsed JSON body."""
+    cache_key = str(httpx.URL(url, params=params))
+    cached = HTTP_CACHE.get(cache_key)
+    headers = {"If-None-Match": cached["etag"]} if cached else None
+
+    for attempt in range(MAX_RETRIES + 1):
+        # Only wait when the API has told us the quota is exhausted
+        delay = rate_limit_resume_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with REQUEST_SLOTS:
+            response = await client.get(url, params=params, headers=headers)
+        update_rate_limit(response)
+
+        throttled = response.status_code in (403, 429) and (
+            "Retry-After" in response.headers or rate_limit_resume_at > time.time()
+        )
+        if not (throttled or response.status_code in RETRY_STATUSES) or attempt == MAX_RETRIES:
+            break
+        await asyncio.sleep(float(response.headers.get("Retry-After", 0 if throttled else 2 ** attempt)))
+
+    if response.status_code == 304:
+        # Unchanged since the last run: rebuild the page from the cache
+        return httpx.Response(200, headers=cached["headers"], request=response.request), cached["data"]
+    if response.status_code != 200:
+        return response, None
+
+    # orjson decodes the large repo listing pages several times faster than the stdlib json module
+    data = orjson.loads(response.content)
+    if "ETag" in response.headers:
+        HTTP_CACHE[cache_key] = {
+            "etag": response.headers["ETag"],
+            "headers": {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+            "data": data
+        }
+    return response, data
+
+async def get_github_repos(client, org):
+    """Yield the repositories of a GitHub organization one page (list) at a time as the pages arrive.
+       The first page is used to read the Link header, then all remaining pages are fetched concurrently.
+    """
+    url = f"https://api.github.com/orgs/{org}/repos"
+    params = {"per_page": 100}
+    response, data = await fetch_page(client, url, {**params, "page": 1})
+    if response.status_code != 200:
+        print(f"Error fetching GitHub repos for {org}: {response.status_code}")
+        return
+
+    # The rel="last" link tells us how many pages there are
+    last = response.links.get("last")
+    last_page = int(parse_qs(urlparse(last["url"]).query)["page"][0]) if last else 1
+
+    # Start the remaining pages in the background, then hand out the pages in order
+    remaining = [
+        asyncio.create_task(fetch_page(client, url, {**params, "page": page}))
+        for page in range(2, last_page + 1)
+    ]
+    yield data
+    for task in remaining:
+        response, data = await task
         if response.status_code != 200:
             print(f"Error fetching GitHub repos for {org}: {response.status_code}")
-            break
-        data = response.json()
-        if not data:
-            break
-        repos.extend(data)
-        page += 1
-        time.sleep(1)  # Respect rate limits
-    return repos
+            continue
+        yield data
 
 # ----- Configuration for GitLab -----
 # Set your GitLab API token in the .env file as GITLAB_TOKEN=your_token_here
@@ -43,69 +146,128 @@ GITLAB_HEADERS = {
     "Accept": "application/json"
 }
 
-def get_gitlab_repos(group):
-    """Fetch all repositories (projects) for a GitLab group.
+# Group path -> numeric id, kept across runs so the group lookup is only needed once
+GROUP_CACHE_FILE = ".gitlab_groups.json"
+
+def load_group_cache():
+    """Load the cached GitLab group ids, or start with an empty mapping"""
+    try:
+        with open(GROUP_CACHE_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_group_cache():
+    """Persist the GitLab group ids for the next run"""
+    with open(GROUP_CACHE_FILE, "wb") as f:
+        f.write(orjson.dumps(GROUP_CACHE))
+
+GROUP_CACHE = load_group_cache()
+
+async def get_gitlab_repos(client, group):
+    """Yield the repositories (projects) of a GitLab group one page (list) at a time as the pages arrive.
        The group is looked up by its path.
     """
-    # First, look up the group info by its URL-encoded path
-    encoded_group = requests.utils.quote(group, safe='')
+    # First, look up the group info by its URL-encoded path (unless we already know its id)
+    encoded_group = quote(group, safe='')
     group_info_url = f"{GITLAB_URL}/api/v4/groups/{encoded_group}"
-    response = requests.get(group_info_url, headers=GITLAB_HEADERS)
+    if group_info_url in GROUP_CACHE:
+        group_id = GROUP_CACHE[group_info_url]
+    else:
+        response, data = await fetch_page(client, group_info_url)
+        if response.status_code != 200:
+            print(f"Error fetching GitLab group info for {group}: {response.status_code}")
+            return
+        group_id = data['id']
+        GROUP_CACHE[group_info_url] = group_id
+
+    # Then, get all projects in the group (including subgroups).
+    # simple=true returns only the basic project fields, which is all we need for web_url.
+    url = f"{GITLAB_URL}/api/v4/groups/{group_id}/projects"
+    params = {"include_subgroups": "true", "simple": "true", "per_page": 100}
+    response, data = await fetch_page(client, url, {**params, "page": 1})
     if response.status_code != 200:
-        print(f"Error fetching GitLab group info for {group}: {response.status_code}")
-        return []
-    group_id = response.json()['id']
-    
-    # Then, get all projects in the group (including subgroups)
-    repos = []
-    page = 1
-    while True:
-        url = f"{GITLAB_URL}/api/v4/groups/{group_id}/projects?include_subgroups=true&per_page=100&page={page}"
-        response = requests.get(url, headers=GITLAB_HEADERS)
+        print(f"Error fetching GitLab repos for group {group}: {response.status_code}")
+        return
+
+    # GitLab reports the number of pages in the X-Total-Pages header, except for very
+    # large result sets (over 10,000 items) where we can only follow X-Next-Page one by one
+    if "X-Total-Pages" not in response.headers:
+        yield data
+        next_page = response.headers.get("X-Next-Page")
+        while next_page:
+            response, data = await fetch_page(client, url, {**params, "page": int(next_page)})
+            if response.status_code != 200:
+                print(f"Error fetching GitLab repos for group {group}: {response.status_code}")
+                return
+            yield data
+            next_page = response.headers.get("X-Next-Page")
+        return
+    last_page = int(response.headers["X-Total-Pages"])
+
+    remaining = [
+        asyncio.create_task(fetch_page(client, url, {**params, "page": page}))
+        for page in range(2, last_page + 1)
+    ]
+    yield data
+    for task in remaining:
+        response, data = await task
         if response.status_code != 200:
             print(f"Error fetching GitLab repos for group {group}: {response.status_code}")
-            break
-        data = response.json()
-        if not data:
-            break
-        repos.extend(data)
-        page += 1
-        time.sleep(1)
-    return repos
+            continue
+        yield data
+
+async def crawl_org(client, platform, country, name, queue):
+    """Put the CSV rows for each page of one organization or group on the queue"""
+    if platform == "github":
+        async for page in get_github_repos(client, name):
+            await queue.put([(country, name, repo.get("html_url", "")) for repo in page])
+    else:
+        async for page in get_gitlab_repos(client, name):
+            await queue.put([(country, name, repo.get("web_url", "")) for repo in page])
+
+async def write_rows(writer, queue):
+    """Drain the queue into the CSV file a page at a time. This is the only task that touches the writer."""
+    while True:
+        rows = await queue.get()
+        writer.writerows(rows)
+        queue.task_done()
 
-def generate_csv(platform, orgs, output_file):
+async def generate_csv(platform, orgs, output_file):
     """
     Generate a CSV file with columns: country, org/group, repo_link.
     The parameter 'orgs' is a list of tuples (country, org_or_group_name).
     The 'platform' parameter should be either "github" or "gitlab".
+    All orgs are crawled concurrently; rows are written as soon as each page arrives.
     """
-    with open(output_file, "w", newline="", encoding="utf-8") as csvfile:
-        fieldnames = ["country", "org/group", "repo_link"]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for country, name in orgs:
-            if platform.lower() == "github":
-                repos = get_github_repos(name)
-                for repo in repos:
-                    writer.writerow({
-                        "country": country,
-                        "org/group": name,
-                        "repo_link": repo.get("html_url", "")
-                    })
-            elif platform.lower() == "gitlab":
-                repos = get_gitlab_repos(name)
-                for repo in repos:
-                    writer.writerow({
-                        "country": country,
-                        "org/group": name,
-                        "repo_link": repo.get("web_url", "")
-                    })
-            else:
-                print(f"Unsupported platform: {platform}")
+    platform = platform.lower()
+    if platform not in ("github", "gitlab"):
+        print(f"Unsupported platform: {platform}")
+        return
+
+    headers = GITLAB_HEADERS if platform == "gitlab" else GITHUB_HEADERS
+    # A 1 MiB buffer turns the many small row writes into few write syscalls
+    with open(output_file, "w", buffering=1 << 20, newline="", encoding="utf-8") as csvfile:
+        # Rows are plain tuples, so a csv.writer avoids DictWriter's per-row field mapping
+        writer = csv.writer(csvfile)
+        writer.writerow(("country", "org/group", "repo_link"))
+
+        # One client is shared by every org so the connection is reused
+        async with create_client(headers) as client:
+            # Bounded so producers wait for the writer instead of piling pages up in memory
+            queue = asyncio.Queue(maxsize=MAX_CONCURRENT_REQUESTS)
+            writer_task = asyncio.create_task(write_rows(writer, queue))
+            await asyncio.gather(*(
+                crawl_org(client, platform, country, name, queue) for country, name in orgs
+            ))
+            await queue.join()
+            writer_task.cancel()
+    save_http_cache()
+    if platform == "gitlab":
+        save_group_cache()
     print(f"CSV file generated: {output_file}")
 
-def main():
+async def main():
     # Choose the platform: either "github" or "gitlab"
     platform = "github"  # Change to "gitlab" if needed
 
@@ -129,7 +291,7 @@ def main():
         return
 
     output_file = "repo_links.csv"
-    generate_csv(platform, orgs, output_file)
+    await generate_csv(platform, orgs, output_file)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
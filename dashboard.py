@@ -1,32 +1,618 @@
+import functools
 import json
+import os
 import pandas as pd
+import pyarrow.parquet as pq
 import plotly
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
+import plotly.io as pio
 import numpy as np
 
-# Add animation to the dashboard header
-def load_lottie_url(url):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
+# Streamlit serializes every figure with plotly.io.to_json; orjson is much faster than the stdlib encoder
+pio.json.config.default_engine = "orjson"
+
+# Text columns (org, repo link, issue text) as Arrow-backed strings instead of Python objects.
+# This is the default from pandas 3; numeric columns keep their NumPy dtypes for the charts
+pd.options.future.infer_string = True
+
+# Nested dicts whose keys are data (file extensions) rather than field names stay in one column
+UNFLATTENED_KEYS = {'code_analysis.file_types'}
+
+def flatten(d, prefix='', out=None):
+    """Flatten a nested dict into a single level with dotted keys, e.g. {'a': {'b': 1}} -> {'a.b': 1}"""
+    if out is None:
+        out = {}
+    for k, v in d.items():
+        key = prefix + k
+        if isinstance(v, dict) and key not in UNFLATTENED_KEYS:
+            flatten(v, key + '.', out)
+        else:
+            out[key] = v
+    return out
+
+# List/dict columns (older results store them as JSON strings) and the value used when missing
+JSON_COLUMNS = {
+    'code_analysis.file_types': dict,
+    'test_coverage.test_frameworks': list,
+    'gemini_scores.critical_issues': list,
+    'gemini_scores.improvement_suggestions': list
+}
+
+def parse_json_cell(v, empty):
+    """List/dict value of a JSON column cell, empty() for blank, null or NaN cells"""
+    if isinstance(v, str):
+        v = json.loads(v) if v else None
+    return v if isinstance(v, (list, dict)) else empty()
+
+RESULTS_JSON = "analysis_results/all_results.json"
+# Flattened copy of the results, rebuilt whenever the JSON file is newer
+RESULTS_PARQUET = "analysis_results/all_results.parquet"
+
+# Column groups the dashboard uses; other columns are not read from the Parquet file
+USED_COLUMN_PREFIXES = (
+    'metadata.',
+    'code_analysis.sustainable.',
+    'code_analysis.unsustainable.',
+    'code_analysis.environmental.',
+    'code_analysis.social.',
+    'code_analysis.total_lines',
+    'code_analysis.file_count',
+    'code_analysis.file_types',
+    'complexity_analysis.',
+    'dependency_analysis.',
+    'test_coverage.',
+    'commit_history.',
+    'repo_structure.',
+    'gemini_scores.'
+)
+
+# Only a few dozen distinct column names exist, so every label is computed once per process
+@functools.lru_cache(maxsize=256)
+def metric_label(col):
+    """Display label of a column ('gemini_scores.error_handling' -> 'Error Handling')"""
+    return col.rsplit('.', 1)[-1].replace('_', ' ').title()
+
+# Fixed column groups shown per repository, with their display labels computed once
+GEMINI_COLS = (
+    'gemini_scores.documentation_quality',
+    'gemini_scores.testing_robustness',
+    'gemini_scores.modularity_and_design',
+    'gemini_scores.error_handling',
+    'gemini_scores.security_best_practices',
+    'gemini_scores.scalability_potential',
+    'gemini_scores.environmental_efficiency',
+    'gemini_scores.social_inclusiveness'
+)
+GEMINI_LABELS = tuple(metric_label(col) for col in GEMINI_COLS)
 
-# Load the JSON data
+COMPLEXITY_COLS = (
+    'complexity_analysis.average',
+    'complexity_analysis.max',
+    'complexity_analysis.complex_functions',
+    'complexity_analysis.maintainability_index'
+)
+COMPLEXITY_LABELS = tuple(metric_label(col) for col in COMPLEXITY_COLS)
+
+TEST_COLS = (
+    'test_coverage.has_tests',
+    'test_coverage.test_files',
+    'test_coverage.test_to_code_ratio',
+    'test_coverage.test_lines'
+)
+TEST_LABELS = tuple(metric_label(col) for col in TEST_COLS)
+
+STRUCTURE_COLS = (
+    'repo_structure.has_readme',
+    'repo_structure.has_license',
+    'repo_structure.has_gitignore',
+    'repo_structure.has_ci_config',
+    'repo_structure.has_dependency_manager',
+    'repo_structure.has_docker',
+    'repo_structure.has_contribution_guide',
+    'repo_structure.has_code_of_conduct',
+    'repo_structure.has_security_policy'
+)
+STRUCTURE_LABELS = tuple(metric_label(col.replace('.has_', '.')) for col in STRUCTURE_COLS)
+
+ARCH_COLS = (
+    'repo_structure.folder_depth',
+    'repo_structure.dependency_count',
+    'repo_structure.architecture_score'
+)
+ARCH_LABELS = tuple(metric_label(col) for col in ARCH_COLS)
+
+# Values shown in the repository overview header
+OVERVIEW_COLS = (
+    'metadata.org',
+    'metadata.country',
+    'metadata.repo_link',
+    'code_analysis.total_lines',
+    'code_analysis.file_count',
+    'commit_history.total_commits',
+    'commit_history.contributors',
+    'test_coverage.has_tests',
+    'gemini_scores.overall_sustainability'
+)
+
+def build_parquet():
+    """Flatten the JSON results, narrow the dtypes and write them to RESULTS_PARQUET"""
+    with open(RESULTS_JSON, "r") as f:
+        data = json.load(f)
+    # Flatten nested JSON for easier analysis (one flat dict per repo, then a single DataFrame call)
+    df = pd.DataFrame([flatten(record) for record in data])
+
+    # Narrow the dtypes: indicator columns as bool, counts as the smallest integer type that fits
+    # and ratios/averages as float32
+    bool_cols = [col for col in df.columns if col.startswith('repo_structure.has_') or col.startswith('test_coverage.has_')]
+    df[bool_cols] = df[bool_cols].fillna(False).astype(bool)
+    int_cols = df.select_dtypes('integer').columns
+    df[int_cols] = df[int_cols].apply(pd.to_numeric, downcast='integer')
+    float_cols = df.select_dtypes('float').columns
+    df[float_cols] = df[float_cols].astype('float32')
+
+    # Lists/dicts are stored as JSON strings, they are parsed back in load_data
+    for col in JSON_COLUMNS:
+        df[col] = df[col].map(lambda v: v if isinstance(v, str) else json.dumps(v))
+    df.to_parquet(RESULTS_PARQUET, compression='zstd')
+
+# Load the analysis results
 @st.cache_data
 def load_data():
-    with open("analysis_results/all_results.json", "r") as f:
-        data = json.load(f)
-    # Flatten nested JSON for easier analysis
-    return pd.json_normalize(data)
+    if not os.path.exists(RESULTS_PARQUET) or os.path.getmtime(RESULTS_PARQUET) < os.path.getmtime(RESULTS_JSON):
+        build_parquet()
+    columns = [col for col in pq.read_schema(RESULTS_PARQUET).names if col.startswith(USED_COLUMN_PREFIXES)]
+    df = pd.read_parquet(RESULTS_PARQUET, columns=columns)
 
-# Set page configuration
-st.set_page_config(layout="wide", page_title="Repository Analysis Dashboard", page_icon="📊")
+    # Parse the list/dict columns once here instead of on every rerun
+    for col, empty in JSON_COLUMNS.items():
+        df[col] = df[col].map(lambda v: parse_json_cell(v, empty))
 
-# Custom CSS
-st.markdown("""
+    # Expand the per-repo extension counts into one dense int32 column per extension
+    # ('.py' -> 'code_analysis.file_types.py') so the treemap totals are a plain column sum
+    file_types = pd.DataFrame(df.pop('code_analysis.file_types').tolist(), index=df.index).fillna(0).astype('int32')
+    file_types.columns = ['code_analysis.file_types.' + ext.lstrip('.') for ext in file_types.columns]
+    df = pd.concat([df, file_types], axis=1)
+
+    # Country/org as categoricals with sorted categories: fast equality filters and a ready sorted list
+    for col in ('metadata.country', 'metadata.org'):
+        df[col] = pd.Categorical(df[col], categories=sorted(df[col].unique()))
+    return df
+
+# cache_resource rather than cache_data: the map is read on every rerun and cache_data would
+# hand out a fresh copy each time. The column lists are tuples so the shared map can't be mutated
+@st.cache_resource(show_spinner=False)
+def column_groups():
+    """Map each metric group ('code_analysis.sustainable', 'gemini_scores', ...) to its columns"""
+    groups = {}
+    # One pass over the columns so the tabs look their groups up instead of rescanning every column
+    for col in load_data().columns:
+        groups.setdefault(col.rpartition('.')[0], []).append(col)
+    return {group: tuple(cols) for group, cols in groups.items()}
+
+@st.cache_data(show_spinner=False)
+def orgs_for(country):
+    """Sorted list of the organizations of a country"""
+    df = load_data()
+    return sorted(df.loc[df['metadata.country'] == country, 'metadata.org'].unique())
+
+# Filtering and the per-tab aggregates only depend on the sidebar selection, so they are
+# cached by (country, org) and every rerun after the first one is a cache lookup
+@st.cache_data(ttl=None, show_spinner=False)
+def get_filtered(country, org):
+    """Return the rows matching the selected country and organization ("All" disables a filter)"""
+    df = load_data()
+    if country != "All":
+        df = df[df['metadata.country'] == country]
+        if org != "All":
+            df = df[df['metadata.org'] == org]
+    return df
+
+@st.cache_data(ttl=None, show_spinner=False)
+def overview_metrics(country, org):
+    """Key metrics shown at the top of the overview tab"""
+    df_filtered = get_filtered(country, org)
+    return {
+        'avg_lines': df_filtered['code_analysis.total_lines'].mean(),
+        'avg_files': df_filtered['code_analysis.file_count'].mean(),
+        'avg_commits': df_filtered['commit_history.total_commits'].mean(),
+        'avg_contrib': df_filtered['commit_history.contributors'].mean(),
+        'avg_sustain': df_filtered['gemini_scores.overall_sustainability'].mean(),
+        'has_tests': df_filtered['test_coverage.has_tests'].mean() * 100
+    }
+
+@st.cache_data(ttl=None, show_spinner=False)
+def column_means(country, org, cols):
+    """Average of each column in cols (a tuple) over the selected repositories, indexed by column name"""
+    df_filtered = get_filtered(country, org)
+    # A single reduction over all the columns instead of one .mean() call per column
+    return df_filtered[list(cols)].mean()
+
+@st.cache_data(ttl=None, show_spinner=False)
+def prefix_means(country, org, group):
+    """Metric/Average table for every column of a metric group (empty if there are none)"""
+    df_filtered = get_filtered(country, org)
+    cols = column_groups().get(group, ())
+    data = df_filtered[list(cols)].mean().reset_index()
+    data.columns = ['Metric', 'Average']
+    data['Metric'] = data['Metric'].map(metric_label)
+    return data
+
+@st.cache_data(ttl=None, show_spinner=False)
+def file_type_totals(country, org):
+    """Total number of files per extension over the selected repositories"""
+    df_filtered = get_filtered(country, org)
+    totals = df_filtered[list(column_groups().get('code_analysis.file_types', ()))].sum()
+    # Extensions that none of the selected repositories use are left out of the treemap
+    return {'.' + col.rpartition('.')[2]: int(total) for col, total in totals.items() if total > 0}
+
+# Upper bound on the number of points sent to the browser for the commit timeline
+MAX_TIMELINE_POINTS = 1000
+
+@st.cache_data(ttl=None, show_spinner=False)
+def commit_timeline(country, org):
+    """Simulated daily commit timeline (None if there is no commit data)"""
+    df_filtered = get_filtered(country, org)
+    # Create a placeholder timeline from the commit counts
+    commits = df_filtered['commit_history.total_commits'].to_numpy()
+    if len(commits) == 0:
+        return None
+
+    # Simulate a timeline
+    n_points = 30
+    dates = pd.date_range(end=pd.Timestamp.now(), periods=n_points)
+
+    # Scale each repo's commits across the time periods (one row per repo), then sum per day
+    daily_commits = np.random.poisson(commits[:, None] / n_points, size=(len(commits), n_points))
+    timeline = pd.DataFrame({'date': dates, 'commits': daily_commits.sum(axis=0)})
+
+    # Long timelines are summed into equal-width buckets so the chart never gets more than
+    # MAX_TIMELINE_POINTS points, however many days are simulated
+    if len(timeline) > MAX_TIMELINE_POINTS:
+        bucket = np.arange(len(timeline)) * MAX_TIMELINE_POINTS // len(timeline)
+        timeline = timeline.groupby(bucket).agg({'date': 'first', 'commits': 'sum'})
+    return timeline
+
+@st.cache_data(ttl=None, show_spinner=False)
+def framework_counts(country, org):
+    """Number of selected repositories using each test framework"""
+    df_filtered = get_filtered(country, org)
+    # One entry per (repo, framework) pair, counted in a single pass
+    return df_filtered['test_coverage.test_frameworks'].explode().dropna().value_counts(sort=False).to_dict()
+
+@st.cache_data(ttl=None, show_spinner=False)
+def top_texts(country, org, column):
+    """Counts of the 10 most common entries of a list column (critical issues, suggestions), grouped by their first 50 chars"""
+    df_filtered = get_filtered(country, org)
+    # One entry per text; the first 50 chars are used as a key to group similar entries
+    texts = df_filtered[column].explode().dropna()
+    return texts.str[:50].value_counts().head(10)
+
+# Aggregates over the whole dataset (not the sidebar selection) only need to run once per process
+@st.cache_data(show_spinner=False)
+def commits_by_country_df():
+    """Total commits per country over all repositories"""
+    df = load_data()
+    return df.groupby("metadata.country", observed=True)["commit_history.total_commits"].sum().reset_index()
+
+@st.cache_data(ttl=None, show_spinner=False)
+def repo_details(country, org, columns):
+    """The given columns (a tuple) of the selected repositories, sorted by sustainability score"""
+    df_filtered = get_filtered(country, org)
+    # Project first so only the displayed columns are sorted and copied
+    return df_filtered.loc[:, list(columns)].sort_values(
+        by='gemini_scores.overall_sustainability',
+        ascending=False
+    ).reset_index(drop=True)
+
+@st.cache_data(show_spinner=False)
+def repo_labels():
+    """Search labels ("org / repo (country)") for all repositories and a label -> row position lookup"""
+    df = load_data()
+    labels = (
+        df['metadata.org'].astype(str) + ' / ' + df['metadata.repo_link'].str.rsplit('/', n=1).str[-1]
+        + ' (' + df['metadata.country'].astype(str) + ')'
+    ).tolist()
+    # Reversed so that the first repository wins if two share a label
+    label_index = {label: i for i, label in reversed(list(enumerate(labels)))}
+    return labels, label_index
+
+# Plotly validates every trace while a figure is built, so the figures are cached as well and
+# reused across reruns while their (small) inputs are unchanged.
+# Cached figures are shared between reruns: never modify a figure returned by these helpers.
+def metric_table(row, cols, labels, names=('Metric', 'Value')):
+    """Label/value table of cols for a one-row frame, built from two arrays in a single call (missing columns are 0)"""
+    return pd.DataFrame({names[0]: labels, names[1]: row.reindex(columns=list(cols), fill_value=0).iloc[0].to_numpy()})
+
+def score_colors(scores):
+    """Cell styles for a column of 0-100 scores, picked for the whole column at once"""
+    values = scores.to_numpy()
+    return np.select(
+        [values >= 80, values >= 60],
+        [
+            'background-color: #c6efce; color: #006100',  # Green
+            'background-color: #ffeb9c; color: #9c5700'   # Yellow
+        ],
+        default='background-color: #ffc7ce; color: #9c0006'  # Red
+    )
+
+@st.cache_data(show_spinner=False)
+def repo_view(repo_idx):
+    """Tables and lists shown in the detail view of the repository at row position repo_idx"""
+    # The repository as a one-row frame, so column groups are gathered with their dtypes
+    row = load_data().iloc[[repo_idx]]
+    view = {}
+
+    # Values of the overview header, gathered in one slice
+    view['overview'] = row[list(OVERVIEW_COLS)].iloc[0].to_dict()
+
+    # Sustainability radar chart and score table
+    view['values'] = tuple(row[list(GEMINI_COLS)].to_numpy(dtype=float)[0])
+    view['score_df'] = metric_table(row, GEMINI_COLS, GEMINI_LABELS, names=("Dimension", "Score"))
+
+    # Top 3 critical issues and improvement suggestions
+    view['issues'] = row['gemini_scores.critical_issues'].iloc[0][:3]
+    view['suggestions'] = row['gemini_scores.improvement_suggestions'].iloc[0][:3]
+
+    # Quality tab (None when the group has no columns)
+    view['sustainable_data'] = view['unsustainable_data'] = None
+    sustainable_cols = column_groups().get('code_analysis.sustainable', ())
+    if sustainable_cols:
+        view['sustainable_data'] = metric_table(row, sustainable_cols, [metric_label(col) for col in sustainable_cols])
+    unsustainable_cols = column_groups().get('code_analysis.unsustainable', ())
+    if unsustainable_cols:
+        view['unsustainable_data'] = metric_table(row, unsustainable_cols, [metric_label(col) for col in unsustainable_cols])
+
+    # Complexity tab
+    view['complexity_data'] = metric_table(row, COMPLEXITY_COLS, COMPLEXITY_LABELS)
+
+    # Testing tab
+    view['test_data'] = metric_table(row, TEST_COLS, TEST_LABELS)
+    view['frameworks'] = row['test_coverage.test_frameworks'].iloc[0]
+
+    # Structure tab
+    present = row.reindex(columns=list(STRUCTURE_COLS), fill_value=False).to_numpy(dtype=bool)[0]
+    view['structure_data'] = pd.DataFrame({
+        'Feature': STRUCTURE_LABELS,
+        'Present': np.where(present, '✅', '❌')
+    })
+    view['arch_data'] = metric_table(row, ARCH_COLS, ARCH_LABELS)
+    return view
+
+@st.cache_resource(show_spinner=False)
+def build_px_fig(kind, data, layout=None, **kwargs):
+    """px.<kind>(data, **kwargs) with optional layout updates, e.g. build_px_fig("bar", df, x='Metric', ...)"""
+    fig = getattr(px, kind)(data, **kwargs)
+    if layout:
+        fig.update_layout(**layout)
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def build_radar_fig(values, categories):
+    """Overview radar chart of the average score per sustainability dimension"""
+    values = np.array(values)
+    categories = list(categories)
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=np.concatenate([values, values[:1]]),  # Close the hexagon by repeating the first value
+        theta=np.array(categories + categories[:1]),  # Close the hexagon by repeating the first category
+        fill='toself',
+        name='Average Score',
+        line_color='rgba(0, 128, 0, 0.8)',  # Green line color
+        fillcolor='rgba(0, 128, 0, 0.3)'  # Green fill color
+    ))
+
+    fig.update_layout(
+        polar=dict(
+        angularaxis=dict(
+            tickfont=dict(size=12, color='rgba(255, 255, 255, 0.8)'),  # White text for categories
+            gridcolor='rgba(255, 255, 255, 0.2)'  # Light white grid lines
+        ),
+        radialaxis=dict(
+            visible=True,
+            range=[0, 100],
+            tickfont=dict(size=10, color='rgba(255, 255, 255, 0.8)'),  # White text for radial ticks
+            gridcolor='rgba(255, 255, 255, 0.2)'  # Light white grid lines
+        ),
+        bgcolor='rgba(0, 0, 0, 0.8)'  # Dark background for the polar chart
+        ),
+        showlegend=False,
+        title=dict(
+        text="Sustainability Dimension Scores",
+        font=dict(size=16, color='rgba(255, 255, 255, 0.9)')  # White title text
+        ),
+        template="plotly_dark",  # Use a dark theme
+        height=500
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def build_timeline_fig(timeline):
+    """Line chart of the simulated commit timeline"""
+    # WebGL trace: drawn in one call instead of one SVG node per point
+    fig = go.Figure(go.Scattergl(
+        x=timeline['date'],
+        y=timeline['commits'],
+        mode="lines+markers",
+        name="commits"
+    ))
+    fig.update_layout(
+        title="Commit Timeline (Simulated)",
+        template="plotly_white",
+        xaxis_title="date",
+        yaxis_title="commits",
+        hovermode="x unified",
+        height=400
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def build_repo_radar_fig(repo_idx):
+    """Radar chart of the sustainability scores of the repository at row position repo_idx"""
+    # Keyed by the repository alone: its scores come from the cached detail view
+    values = np.array(repo_view(repo_idx)['values'])
+    categories = list(GEMINI_LABELS)
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        r=np.concatenate([values, values[:1]]),
+        theta=np.array(categories + categories[:1]),
+        fill='toself',
+        line_color='rgba(0, 128, 0, 0.8)',
+        fillcolor='rgba(0, 128, 0, 0.3)'
+    ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(visible=True, range=[0, 100]),
+            bgcolor='rgba(0, 0, 0, 0.8)'
+        ),
+        showlegend=False,
+        title="Sustainability Dimension Scores",
+        template="plotly_dark",
+        height=400
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False)
+def build_repo_complexity_fig(repo_idx):
+    """Complexity bar chart of the repository at row position repo_idx"""
+    # Keyed by the repository so the cache lookup doesn't hash the complexity table on every rerun
+    return px.bar(
+        repo_view(repo_idx)['complexity_data'],
+        x='Metric',
+        y='Value',
+        color='Metric',
+        title="Code Complexity Metrics",
+        template="plotly_white"
+    )
+
+def two_col(left, right):
+    """Run the left and right render callables side by side in one st.columns(2) row"""
+    col1, col2 = st.columns(2)
+    with col1:
+        left()
+    with col2:
+        right()
+
+def metric_block(title, data, empty_message=None):
+    """Heading followed by a metric table, or empty_message when the table is None"""
+    st.markdown(f"#### {title}")
+    if data is not None:
+        # A few static rows: a plain st.table is lighter than the interactive st.dataframe grid
+        st.table(data)
+    else:
+        st.info(empty_message)
+
+def frameworks_block(frameworks):
+    """Heading followed by the detected testing frameworks"""
+    st.markdown("#### Testing Frameworks")
+    if frameworks:
+        st.write(", ".join(frameworks))
+    else:
+        st.info("No testing frameworks detected")
+
+# A fragment: switching the metric category only reruns this function, not the whole page
+@st.fragment
+def render_repo_detail(repo_idx):
+    """Overview, scores and metric details of the repository at row position repo_idx"""
+    # Header values and detail tables are built once per repository and reused on every rerun
+    view = repo_view(repo_idx)
+
+    # Repository Overview
+    overview = view['overview']
+    st.markdown("### Repository Overview")
+    col1, col2, col3 = st.columns(3)
+
+    # One markdown element per column, the lines stay separate paragraphs
+    with col1:
+        st.markdown("\n\n".join((
+            f"**Organization:** {overview['metadata.org']}",
+            f"**Country:** {overview['metadata.country']}",
+            f"**Repository Link:** [GitHub]({overview['metadata.repo_link']})"
+        )))
+
+    with col2:
+        st.markdown("\n\n".join((
+            f"**Total Lines:** {int(overview['code_analysis.total_lines'])}",
+            f"**File Count:** {int(overview['code_analysis.file_count'])}",
+            f"**Total Commits:** {int(overview['commit_history.total_commits'])}"
+        )))
+
+    with col3:
+        st.markdown("\n\n".join((
+            f"**Contributors:** {int(overview['commit_history.contributors'])}",
+            f"**Has Tests:** {'Yes' if overview['test_coverage.has_tests'] else 'No'}",
+            f"**Overall Sustainability:** {overview['gemini_scores.overall_sustainability']:.1f}/100"
+        )))
+
+    # Sustainability Scores
+    st.markdown("### Sustainability Scores")
+
+    # Create two columns for a more compact display
+    col1, col2 = st.columns(2)
+
+    with col1:
+        # Sustainability radar chart
+        fig = build_repo_radar_fig(repo_idx)
+        # Decorative only: a static plot skips plotly.js hover/zoom handling in the browser
+        st.plotly_chart(fig, use_container_width=True, key="repo_radar", config={'staticPlot': True})
+
+    with col2:
+        # Display individual scores in a table
+        score_df = view['score_df']
+
+        # Add a color coding based on score
+        st.dataframe(score_df.style.apply(score_colors, subset=['Score']), use_container_width=True)
+
+        # Critical Issues and Improvement Suggestions
+        if view['issues']:
+            st.markdown("#### Top Critical Issues")
+            for issue in view['issues']:
+                st.markdown(f"- {issue}")
+
+        if view['suggestions']:
+            st.markdown("#### Top Improvement Suggestions")
+            for suggestion in view['suggestions']:
+                st.markdown(f"- {suggestion}")
+
+    # Code Metrics Details
+    st.markdown("### Code Metrics Details")
+
+    # One metric category at a time: st.tabs would build all four on every rerun,
+    # a radio only runs the branch of the category that is shown
+    metrics_view = st.radio(
+        "Metric category",
+        ["Quality", "Complexity", "Testing", "Structure"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="repo_metrics_view"
+    )
+
+    if metrics_view == "Quality":
+        two_col(
+            lambda: metric_block("Sustainable Code Practices", view['sustainable_data'], "No sustainable code metrics available"),
+            lambda: metric_block("Code Smells & Issues", view['unsustainable_data'], "No code smell metrics available")
+        )
+
+    elif metrics_view == "Complexity":
+        fig = build_repo_complexity_fig(repo_idx)
+        st.plotly_chart(fig, use_container_width=True, key="repo_complexity")
+
+    elif metrics_view == "Testing":
+        two_col(
+            lambda: metric_block("Testing Metrics", view['test_data']),
+            lambda: frameworks_block(view['frameworks'])
+        )
+
+    elif metrics_view == "Structure":
+        two_col(
+            lambda: metric_block("Repository Structure", view['structure_data']),
+            lambda: metric_block("Architecture Metrics", view['arch_data'])
+        )
+
+# Static page content, defined once instead of inline in the page code
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -48,37 +634,52 @@ st.markdown("""
         color: #333;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+HEADER_HTML = "<h1 class='main-header'>Code Repository Analysis Dashboard</h1>"
+INTRO_MD = "This dashboard analyzes multiple aspects of your repositories including **code quality**, **complexity**, **dependencies**, **testing coverage**, **commit history**, and **sustainability scores**."
+
+SCORE_INTERPRETATION_MD = """
+- **Documentation Quality**: Code comments, API docs, README
+- **Testing Robustness**: Test coverage, test types, CI integration
+- **Modularity**: Code organization, separation of concerns
+- **Error Handling**: Exception management, logging
+- **Security**: Auth practices, input validation, dependency management
+- **Scalability**: Performance under load, architecture
+- **Environmental**: Computation efficiency, resource usage
+- **Social**: Accessibility, inclusivity, ethics
+"""
+
+# Set page configuration
+st.set_page_config(layout="wide", page_title="Repository Analysis Dashboard", page_icon="📊")
+
+# Custom CSS
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Load data
 df = load_data()
 
-# Load animation
-#lottie_data = load_lottie_url("https://assets2.lottiefiles.com/packages/lf20_uwWgICVMrw.json")
-
-# Dashboard Header with Animation
+# Dashboard Header
 col1, col2, col3 = st.columns([1, 2, 1])
 with col2:
-    #st_lottie(lottie_data, height=200, key="coding_animation")
-    st.markdown("<h1 class='main-header'>Code Repository Analysis Dashboard</h1>", unsafe_allow_html=True)
-    st.markdown("This dashboard analyzes multiple aspects of your repositories including **code quality**, **complexity**, **dependencies**, **testing coverage**, **commit history**, and **sustainability scores**.")
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
+    st.markdown(INTRO_MD)
 
 # Sidebar: Enhanced filters
 st.sidebar.header("Filter Options")
-countries = sorted(df['metadata.country'].unique().tolist())
+countries = df['metadata.country'].cat.categories.tolist()
 selected_country = st.sidebar.selectbox("Select Country", ["All"] + countries)
 
 # Add org filter if country is selected
+selected_org = "All"
 if selected_country != "All":
-    df_filtered = df[df['metadata.country'] == selected_country]
-    orgs = sorted(df_filtered['metadata.org'].unique().tolist())
+    orgs = orgs_for(selected_country)
     selected_org = st.sidebar.selectbox("Select Organization", ["All"] + orgs)
-    if selected_org != "All":
-        df_filtered = df_filtered[df_filtered['metadata.org'] == selected_org]
-else:
-    df_filtered = df.copy()
+df_filtered = get_filtered(selected_country, selected_org)
 
-# Dashboard main content with tabs
+# Dashboard main content with tabs.
+# Every chart has a stable key so a rerun updates the existing Plotly element in place
+# (Plotly.react) instead of tearing it down and creating a new one.
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📈 Overview", "🧹 Code Quality", "🔄 Commits & Testing", "🛡️ Security & Structure", "💡 Insights", "🔍 Repository Search"])
 
 # Tab 1: Overview
@@ -86,21 +687,23 @@ with tab1:
     # Key metrics with improved styling
     st.markdown("## Key Metrics")
     
+    metrics = overview_metrics(selected_country, selected_org)
+
     # First row of metrics
     col1, col2, col3 = st.columns(3)
     with col1:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        avg_lines = df_filtered['code_analysis.total_lines'].mean()
+        avg_lines = metrics['avg_lines']
         st.metric("Avg Total Lines", f"{avg_lines:.0f}")
         st.markdown("</div>", unsafe_allow_html=True)
     with col2:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        avg_files = df_filtered['code_analysis.file_count'].mean()
+        avg_files = metrics['avg_files']
         st.metric("Avg File Count", f"{avg_files:.0f}")
         st.markdown("</div>", unsafe_allow_html=True)
     with col3:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        avg_commits = df_filtered['commit_history.total_commits'].mean()
+        avg_commits = metrics['avg_commits']
         st.metric("Avg Commits", f"{avg_commits:.0f}")
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -108,17 +711,17 @@ with tab1:
     col1, col2, col3 = st.columns(3)
     with col1:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        avg_contrib = df_filtered['commit_history.contributors'].mean()
+        avg_contrib = metrics['avg_contrib']
         st.metric("Avg Contributors", f"{avg_contrib:.1f}")
         st.markdown("</div>", unsafe_allow_html=True)
     with col2:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        avg_sustain = df_filtered['gemini_scores.overall_sustainability'].mean()
+        avg_sustain = metrics['avg_sustain']
         st.metric("Avg Sustainability Score", f"{avg_sustain:.1f}/100")
         st.markdown("</div>", unsafe_allow_html=True)
     with col3:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
-        has_tests = df_filtered['test_coverage.has_tests'].mean() * 100
+        has_tests = metrics['has_tests']
         st.metric("Repos with Tests (%)", f"{has_tests:.1f}%")
         st.markdown("</div>", unsafe_allow_html=True)
     
@@ -127,66 +730,14 @@ with tab1:
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        gemini_cols = [
-            'gemini_scores.documentation_quality',
-            'gemini_scores.testing_robustness',
-            'gemini_scores.modularity_and_design',
-            'gemini_scores.error_handling',
-            'gemini_scores.security_best_practices',
-            'gemini_scores.scalability_potential',
-            'gemini_scores.environmental_efficiency',
-            'gemini_scores.social_inclusiveness'
-        ]
-        
-        categories = [col.split('.')[-1].replace('_', ' ').title() for col in gemini_cols]
-        values = [df_filtered[col].mean() for col in gemini_cols]
+        values = column_means(selected_country, selected_org, GEMINI_COLS).to_numpy()
         
-        fig = go.Figure()
-        fig.add_trace(go.Scatterpolar(
-            r=values + [values[0]],  # Close the hexagon by repeating the first value
-            theta=categories + [categories[0]],  # Close the hexagon by repeating the first category
-            fill='toself',
-            name='Average Score',
-            line_color='rgba(0, 128, 0, 0.8)',  # Green line color
-            fillcolor='rgba(0, 128, 0, 0.3)'  # Green fill color
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-            angularaxis=dict(
-                tickfont=dict(size=12, color='rgba(255, 255, 255, 0.8)'),  # White text for categories
-                gridcolor='rgba(255, 255, 255, 0.2)'  # Light white grid lines
-            ),
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100],
-                tickfont=dict(size=10, color='rgba(255, 255, 255, 0.8)'),  # White text for radial ticks
-                gridcolor='rgba(255, 255, 255, 0.2)'  # Light white grid lines
-            ),
-            bgcolor='rgba(0, 0, 0, 0.8)'  # Dark background for the polar chart
-            ),
-            showlegend=False,
-            title=dict(
-            text="Sustainability Dimension Scores",
-            font=dict(size=16, color='rgba(255, 255, 255, 0.9)')  # White title text
-            ),
-            template="plotly_dark",  # Use a dark theme
-            height=500
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = build_radar_fig(tuple(values), GEMINI_LABELS)
+        st.plotly_chart(fig, use_container_width=True, key="overview_radar")
     
     with col2:
         st.markdown("#### Score Interpretation")
-        st.markdown("""
-        - **Documentation Quality**: Code comments, API docs, README
-        - **Testing Robustness**: Test coverage, test types, CI integration
-        - **Modularity**: Code organization, separation of concerns
-        - **Error Handling**: Exception management, logging
-        - **Security**: Auth practices, input validation, dependency management
-        - **Scalability**: Performance under load, architecture
-        - **Environmental**: Computation efficiency, resource usage
-        - **Social**: Accessibility, inclusivity, ethics
-        """)
+        st.markdown(SCORE_INTERPRETATION_MD)
     
     # File Type Distribution
     st.markdown("## Repository Composition")
@@ -194,19 +745,7 @@ with tab1:
     
     with col1:
         # Extract file types data
-        file_types = {}
-        for repo_idx, row in df_filtered.iterrows():
-            file_types_str = row.get('code_analysis.file_types', '{}')
-            if isinstance(file_types_str, str):
-                types_dict = json.loads(file_types_str)
-            else:
-                types_dict = file_types_str
-            
-            for file_type, count in types_dict.items():
-                if file_type in file_types:
-                    file_types[file_type] += count
-                else:
-                    file_types[file_type] = count
+        file_types = file_type_totals(selected_country, selected_org)
         
         # Create a dataframe for visualization
         if file_types:
@@ -215,14 +754,15 @@ with tab1:
                 'Count': list(file_types.values())
             })
             
-            fig = px.treemap(
+            fig = build_px_fig(
+                "treemap",
                 file_type_df,
                 path=['Extension'],
                 values='Count',
                 title="File Type Distribution",
                 color_discrete_sequence=px.colors.qualitative.Pastel
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="overview_file_types")
         else:
             st.info("No file type data available")
     
@@ -232,51 +772,11 @@ with tab1:
         # This is a placeholder - in a real implementation, we'd need time series data
         # Here we simulate a commit timeline from the data
         
-        # Create a placeholder timeline using contributors and commits
-        commits = df_filtered['commit_history.total_commits'].tolist()
-        contribs = df_filtered['commit_history.contributors'].tolist()
+        timeline = commit_timeline(selected_country, selected_org)
         
-        if commits and contribs:
-            # Simulate a timeline
-            n_points = 30
-            dates = pd.date_range(end=pd.Timestamp.now(), periods=n_points)
-            
-            # Generate some simulated commit data
-            commit_data = []
-            for i, (c, cont) in enumerate(zip(commits, contribs)):
-                # Skip if we're out of repos
-                if i >= len(commits):
-                    break
-                    
-                # Scale the commits across time periods
-                daily_commits = np.random.poisson(c/n_points, n_points)
-                for j, date in enumerate(dates):
-                    commit_data.append({
-                        'date': date,
-                        'commits': daily_commits[j],
-                        'repo_idx': i
-                    })
-            
-            commit_df = pd.DataFrame(commit_data)
-            commit_timeline = commit_df.groupby('date')['commits'].sum().reset_index()
-            
-            fig = px.line(
-                commit_timeline, 
-                x='date', 
-                y='commits',
-                markers=True,
-                title="Commit Timeline (Simulated)",
-                template="plotly_white"
-            )
-            
-            # Add animation effect
-            fig.update_traces(mode="lines+markers")
-            fig.update_layout(
-                hovermode="x unified",
-                height=400
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+        if timeline is not None:
+            fig = build_timeline_fig(timeline)
+            st.plotly_chart(fig, use_container_width=True, key="overview_commit_timeline")
         else:
             st.info("No commit data available")
 
@@ -290,68 +790,55 @@ with tab2:
     with col1:
         # Sustainable metrics
         st.markdown("### Sustainable Code Practices")
-        sustainable_cols = [col for col in df_filtered.columns if col.startswith('code_analysis.sustainable.')]
+        sustainable_data = prefix_means(selected_country, selected_org, 'code_analysis.sustainable')
         
-        if sustainable_cols:
-            sustainable_data = pd.DataFrame({
-                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in sustainable_cols],
-                'Average': [df_filtered[col].mean() for col in sustainable_cols]
-            })
-            
-            fig = px.bar(
+        if not sustainable_data.empty:
+            fig = build_px_fig(
+                "bar",
                 sustainable_data,
                 x='Metric',
                 y='Average',
                 color='Average',
                 color_continuous_scale='Viridis',
                 title="Sustainable Code Metrics",
-                template="plotly_white"
+                template="plotly_white",
+                # set the y-axis range to 0-400
+                layout=dict(yaxis_range=[0, 400])
             )
-            # set the y-axis range to 0-400
-            fig.update_yaxes(range=[0, 400])
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="quality_sustainable")
         else:
             st.info("No sustainable code metrics available")
     
     with col2:
         # Unsustainable metrics
         st.markdown("### Code Smells & Issues")
-        unsustainable_cols = [col for col in df_filtered.columns if col.startswith('code_analysis.unsustainable.')]
+        unsustainable_data = prefix_means(selected_country, selected_org, 'code_analysis.unsustainable')
         
-        if unsustainable_cols:
-            unsustainable_data = pd.DataFrame({
-                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in unsustainable_cols],
-                'Average': [df_filtered[col].mean() for col in unsustainable_cols]
-            })
-            
-            fig = px.bar(
+        if not unsustainable_data.empty:
+            fig = build_px_fig(
+                "bar",
                 unsustainable_data,
                 x='Metric',
                 y='Average',
                 color='Average',
                 color_continuous_scale='Reds',
                 title="Code Smells & Issues",
-                template="plotly_white"
+                template="plotly_white",
+                # set the y-axis range to 0-100
+                layout=dict(yaxis_range=[0, 100])
             )
-            # set the y-axis range to 0-100
-            fig.update_yaxes(range=[0, 100])
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="quality_smells")
         else:
             st.info("No code smell metrics available")
     
     # Complexity metrics
     st.markdown("### Code Complexity Analysis")
-    complexity_cols = [
-        'complexity_analysis.average',
-        'complexity_analysis.max',
-        'complexity_analysis.complex_functions',
-        'complexity_analysis.maintainability_index'
-    ]
     
-    complexity_data = df_filtered[complexity_cols].mean().reset_index()
+    complexity_data = column_means(selected_country, selected_org, COMPLEXITY_COLS).reset_index()
     complexity_data.columns = ['Metric', 'Value']
     
-    fig = px.bar(
+    fig = build_px_fig(
+        "bar",
         complexity_data,
         x='Metric',
         y='Value',
@@ -359,22 +846,18 @@ with tab2:
         title="Code Complexity Metrics",
         template="plotly_white"
     )
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, use_container_width=True, key="quality_complexity")
     
     # Environmental & Social Impact
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### Environmental Impact")
-        environmental_cols = [col for col in df_filtered.columns if col.startswith('code_analysis.environmental.')]
+        env_data = prefix_means(selected_country, selected_org, 'code_analysis.environmental')
         
-        if environmental_cols:
-            env_data = pd.DataFrame({
-                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in environmental_cols],
-                'Average': [df_filtered[col].mean() for col in environmental_cols]
-            })
-            
-            fig = px.bar(
+        if not env_data.empty:
+            fig = build_px_fig(
+                "bar",
                 env_data,
                 x='Metric',
                 y='Average',
@@ -383,21 +866,17 @@ with tab2:
                 title="Environmental Impact Metrics",
                 template="plotly_white"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="quality_environmental")
         else:
             st.info("No environmental metrics available")
     
     with col2:
         st.markdown("### Social Impact")
-        social_cols = [col for col in df_filtered.columns if col.startswith('code_analysis.social.')]
+        social_data = prefix_means(selected_country, selected_org, 'code_analysis.social')
         
-        if social_cols:
-            social_data = pd.DataFrame({
-                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in social_cols],
-                'Average': [df_filtered[col].mean() for col in social_cols]
-            })
-            
-            fig = px.bar(
+        if not social_data.empty:
+            fig = build_px_fig(
+                "bar",
                 social_data,
                 x='Metric',
                 y='Average',
@@ -406,7 +885,7 @@ with tab2:
                 title="Social Impact Metrics",
                 template="plotly_white"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="quality_social")
         else:
             st.info("No social impact metrics available")
 
@@ -427,31 +906,31 @@ with tab3:
             'commit_history.test_driven_commits'
         ]
         
-        commit_data = df_filtered[commit_cols].mean().reset_index()
+        commit_data = column_means(selected_country, selected_org, tuple(commit_cols)).reset_index()
         commit_data.columns = ['Metric', 'Value']
         
         # Clean up metric names
-        commit_data['Metric'] = commit_data['Metric'].apply(
-            lambda x: x.split('.')[-1].replace('_', ' ').title()
-        )
+        commit_data['Metric'] = commit_data['Metric'].map(metric_label)
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             commit_data,
             x='Metric',
             y='Value',
             color='Metric',
             title="Commit History Metrics",
-            template="plotly_white"
+            template="plotly_white",
+            # set the y-axis range to 0-150
+            layout=dict(yaxis_range=[0, 150])
         )
-        # set the y-axis range to 0-150
-        fig.update_yaxes(range=[0, 150])
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="commits_metrics")
         
         # Commits by Country
         st.markdown("### Commits by Country")
-        commits_by_country = df.groupby("metadata.country")["commit_history.total_commits"].sum().reset_index()
+        commits_by_country = commits_by_country_df()
         
-        fig = px.pie(
+        fig = build_px_fig(
+            "pie",
             commits_by_country,
             names="metadata.country",
             values="commit_history.total_commits",
@@ -459,55 +938,37 @@ with tab3:
             template="plotly_white",
             hole=0.4
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="commits_by_country")
     
     with col2:
         st.markdown("### Testing Coverage Analysis")
         
         # Test metrics visualization
-        test_cols = [
-            'test_coverage.has_tests',
-            'test_coverage.test_files',
-            'test_coverage.test_to_code_ratio',
-            'test_coverage.test_lines'
-        ]
         
-        test_data = df_filtered[test_cols].mean().reset_index()
+        test_data = column_means(selected_country, selected_org, TEST_COLS).reset_index()
         test_data.columns = ['Metric', 'Value']
         
         # Clean up metric names
-        test_data['Metric'] = test_data['Metric'].apply(
-            lambda x: x.split('.')[-1].replace('_', ' ').title()
-        )
+        test_data['Metric'] = TEST_LABELS
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             test_data,
             x='Metric',
             y='Value',
             color='Metric',
             title="Testing Metrics",
-            template="plotly_white"
+            template="plotly_white",
+            # set the y-axis range to 0-100
+            layout=dict(yaxis_range=[0, 100])
         )
-        # set the y-axis range to 0-100
-        fig.update_yaxes(range=[0, 100])
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="testing_metrics")
         
         # Test Frameworks Used
         st.markdown("### Testing Frameworks")
         
         # Extract test frameworks
-        test_frameworks = {}
-        for _, row in df_filtered.iterrows():
-            frameworks = row.get('test_coverage.test_frameworks', [])
-            if frameworks:
-                if isinstance(frameworks, str):
-                    frameworks = json.loads(frameworks)
-                
-                for framework in frameworks:
-                    if framework in test_frameworks:
-                        test_frameworks[framework] += 1
-                    else:
-                        test_frameworks[framework] = 1
+        test_frameworks = framework_counts(selected_country, selected_org)
         
         if test_frameworks:
             framework_df = pd.DataFrame({
@@ -515,14 +976,15 @@ with tab3:
                 'Count': list(test_frameworks.values())
             })
             
-            fig = px.pie(
+            fig = build_px_fig(
+                "pie",
                 framework_df,
                 names='Framework',
                 values='Count',
                 title="Testing Frameworks Used",
                 template="plotly_white"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="testing_frameworks")
         else:
             st.info("No testing framework data available")
 
@@ -534,58 +996,39 @@ with tab4:
         st.markdown("### Repository Structure Analysis")
         
         # Structure metrics
-        structure_cols = [
-            'repo_structure.has_readme',
-            'repo_structure.has_license',
-            'repo_structure.has_gitignore',
-            'repo_structure.has_ci_config',
-            'repo_structure.has_dependency_manager',
-            'repo_structure.has_docker',
-            'repo_structure.has_contribution_guide',
-            'repo_structure.has_code_of_conduct',
-            'repo_structure.has_security_policy'
-        ]
         
-        structure_data = df_filtered[structure_cols].mean().reset_index()
+        structure_data = column_means(selected_country, selected_org, STRUCTURE_COLS).reset_index()
         structure_data.columns = ['Feature', 'Adoption Rate']
         
         # Multiply by 100 to get percentage
         structure_data['Adoption Rate'] = structure_data['Adoption Rate'] * 100
         
         # Clean up feature names
-        structure_data['Feature'] = structure_data['Feature'].apply(
-            lambda x: x.split('.')[-1].replace('has_', '').replace('_', ' ').title()
-        )
+        structure_data['Feature'] = STRUCTURE_LABELS
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             structure_data,
             x='Feature',
             y='Adoption Rate',
             color='Adoption Rate',
             color_continuous_scale='Blues',
             title="Repository Feature Adoption (%)",
-            template="plotly_white"
+            template="plotly_white",
+            layout=dict(yaxis_title="Adoption Rate (%)")
         )
-        
-        fig.update_layout(yaxis_title="Adoption Rate (%)")
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="structure_features")
         
         # Folder Depth & Architecture
-        folder_cols = [
-            'repo_structure.folder_depth',
-            'repo_structure.dependency_count',
-            'repo_structure.architecture_score'
-        ]
         
-        folder_data = df_filtered[folder_cols].mean().reset_index()
+        folder_data = column_means(selected_country, selected_org, ARCH_COLS).reset_index()
         folder_data.columns = ['Metric', 'Value']
         
         # Clean up metric names
-        folder_data['Metric'] = folder_data['Metric'].apply(
-            lambda x: x.split('.')[-1].replace('_', ' ').title()
-        )
+        folder_data['Metric'] = ARCH_LABELS
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             folder_data,
             x='Metric',
             y='Value',
@@ -593,7 +1036,7 @@ with tab4:
             title="Repository Architecture Metrics",
             template="plotly_white"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="structure_architecture")
     
     with col2:
         st.markdown("### Dependency Analysis")
@@ -606,15 +1049,14 @@ with tab4:
             'dependency_analysis.outdated_dependencies'
         ]
         
-        dependency_data = df_filtered[dependency_cols].mean().reset_index()
+        dependency_data = column_means(selected_country, selected_org, tuple(dependency_cols)).reset_index()
         dependency_data.columns = ['Metric', 'Value']
         
         # Clean up metric names
-        dependency_data['Metric'] = dependency_data['Metric'].apply(
-            lambda x: x.split('.')[-1].replace('_', ' ').title()
-        )
+        dependency_data['Metric'] = dependency_data['Metric'].map(metric_label)
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             dependency_data,
             x='Metric',
             y='Value',
@@ -622,17 +1064,22 @@ with tab4:
             title="Dependency Metrics",
             template="plotly_white"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="dependency_metrics")
         
         # Security Metrics
         st.markdown("### Security Analysis")
         
         # Security aspects from various sections
+        security_best, error_handling, security_policy = column_means(selected_country, selected_org, (
+            'gemini_scores.security_best_practices',
+            'gemini_scores.error_handling',
+            'repo_structure.has_security_policy'
+        ))
         security_metrics = {
-            'Security Best Practices': df_filtered['gemini_scores.security_best_practices'].mean(),
-            'Error Handling': df_filtered['gemini_scores.error_handling'].mean(),
-            'Has Security Policy': df_filtered['repo_structure.has_security_policy'].mean() * 100,
-            'Code Smells': df_filtered['code_analysis.unsustainable.code_smells'].mean() if 'code_analysis.unsustainable.code_smells' in df_filtered.columns else 0
+            'Security Best Practices': security_best,
+            'Error Handling': error_handling,
+            'Has Security Policy': security_policy * 100,
+            'Code Smells': column_means(selected_country, selected_org, ('code_analysis.unsustainable.code_smells',)).iloc[0] if 'code_analysis.unsustainable.code_smells' in df_filtered.columns else 0
         }
         
         security_df = pd.DataFrame({
@@ -640,7 +1087,8 @@ with tab4:
             'Value': list(security_metrics.values())
         })
         
-        fig = px.bar(
+        fig = build_px_fig(
+            "bar",
             security_df,
             x='Aspect',
             y='Value',
@@ -648,7 +1096,7 @@ with tab4:
             title="Security Aspects",
             template="plotly_white"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key="security_aspects")
 
 # Tab 5: Insights
 with tab5:
@@ -661,33 +1109,17 @@ with tab5:
         st.markdown("### Common Critical Issues")
         
         # Extract and count critical issues
-        all_issues = []
-        for _, row in df_filtered.iterrows():
-            issues = row.get('gemini_scores.critical_issues', [])
-            if issues:
-                if isinstance(issues, str):
-                    issues = json.loads(issues)
-                all_issues.extend(issues)
+        top_issues = top_texts(selected_country, selected_org, 'gemini_scores.critical_issues')
         
-        if all_issues:
-            # Group similar issues (simplified approach)
-            issue_counts = {}
-            for issue in all_issues:
-                # Use just the first 50 chars as a key to group similar issues
-                key = issue[:50]
-                if key in issue_counts:
-                    issue_counts[key] += 1
-                else:
-                    issue_counts[key] = 1
-            
+        if not top_issues.empty:
             # Display top issues
-            top_issues = sorted(issue_counts.items(), key=lambda x: x[1], reverse=True)[:10]
             issue_df = pd.DataFrame({
-                'Issue': [f"{issue}..." for issue, _ in top_issues],
-                'Count': [count for _, count in top_issues]
+                'Issue': top_issues.index + "...",
+                'Count': top_issues.to_numpy()
             })
             
-            fig = px.bar(
+            fig = build_px_fig(
+                "bar",
                 issue_df,
                 x='Count',
                 y='Issue',
@@ -697,7 +1129,7 @@ with tab5:
                 title="Top Critical Issues",
                 template="plotly_white"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="insights_issues")
         else:
             st.info("No critical issues data available")
     
@@ -705,33 +1137,17 @@ with tab5:
         st.markdown("### Common Improvement Suggestions")
         
         # Extract and count improvement suggestions
-        all_suggestions = []
-        for _, row in df_filtered.iterrows():
-            suggestions = row.get('gemini_scores.improvement_suggestions', [])
-            if suggestions:
-                if isinstance(suggestions, str):
-                    suggestions = json.loads(suggestions)
-                all_suggestions.extend(suggestions)
+        top_suggestions = top_texts(selected_country, selected_org, 'gemini_scores.improvement_suggestions')
         
-        if all_suggestions:
-            # Group similar suggestions (simplified approach)
-            suggestion_counts = {}
-            for suggestion in all_suggestions:
-                # Use just the first 50 chars as a key to group similar suggestions
-                key = suggestion[:50]
-                if key in suggestion_counts:
-                    suggestion_counts[key] += 1
-                else:
-                    suggestion_counts[key] = 1
-            
+        if not top_suggestions.empty:
             # Display top suggestions
-            top_suggestions = sorted(suggestion_counts.items(), key=lambda x: x[1], reverse=True)[:10]
             suggestion_df = pd.DataFrame({
-                'Suggestion': [f"{suggestion}..." for suggestion, _ in top_suggestions],
-                'Count': [count for _, count in top_suggestions]
+                'Suggestion': top_suggestions.index + "...",
+                'Count': top_suggestions.to_numpy()
             })
             
-            fig = px.bar(
+            fig = build_px_fig(
+                "bar",
                 suggestion_df,
                 x='Count',
                 y='Suggestion',
@@ -741,7 +1157,7 @@ with tab5:
                 title="Top Improvement Suggestions",
                 template="plotly_white"
             )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key="insights_suggestions")
         else:
             st.info("No improvement suggestions data available")
     
@@ -757,10 +1173,7 @@ with tab5:
     ]
     
     # Sort by sustainability score
-    df_details = df_filtered[detail_columns].sort_values(
-        by='gemini_scores.overall_sustainability', 
-        ascending=False
-    ).reset_index(drop=True)
+    df_details = repo_details(selected_country, selected_org, tuple(detail_columns))
     
     # Rename columns for display
     df_details.columns = [
@@ -779,9 +1192,7 @@ with tab5:
         st.markdown("## Repository Search")
         
         # Create a list of repositories with org and country for better context
-        repo_list = []
-        for _, row in df.iterrows():
-            repo_list.append(f"{row['metadata.org']} / {row['metadata.repo_link'].split('/')[-1]} ({row['metadata.country']})")
+        repo_list, repo_index = repo_labels()
         
         # Search box with autocomplete
         search_term = st.text_input("Search repositories by name, organization, or country:", "")
@@ -796,256 +1207,10 @@ with tab5:
         if filtered_repos:
             selected_repo = st.selectbox("Select a repository:", filtered_repos)
             
-            # Extract org, repo name and country from the selected option
-            selected_parts = selected_repo.split(" / ")
-            selected_org = selected_parts[0]
-            selected_repo_name = selected_parts[1].split(" (")[0]
-            
             # Find the repository in the dataframe
-            repo_mask = (df['metadata.org'] == selected_org) & (df['metadata.repo_link'].str.endswith(selected_repo_name))
-            if repo_mask.any():
-                repo_data = df[repo_mask].iloc[0]
-                
-                # Repository Overview
-                st.markdown("### Repository Overview")
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown(f"**Organization:** {repo_data['metadata.org']}")
-                    st.markdown(f"**Country:** {repo_data['metadata.country']}")
-                    st.markdown(f"**Repository Link:** [GitHub]({repo_data['metadata.repo_link']})")
-                
-                with col2:
-                    st.markdown(f"**Total Lines:** {int(repo_data['code_analysis.total_lines'])}")
-                    st.markdown(f"**File Count:** {int(repo_data['code_analysis.file_count'])}")
-                    st.markdown(f"**Total Commits:** {int(repo_data['commit_history.total_commits'])}")
-                
-                with col3:
-                    st.markdown(f"**Contributors:** {int(repo_data['commit_history.contributors'])}")
-                    st.markdown(f"**Has Tests:** {'Yes' if repo_data['test_coverage.has_tests'] else 'No'}")
-                    st.markdown(f"**Overall Sustainability:** {repo_data['gemini_scores.overall_sustainability']:.1f}/100")
-                
-                # Sustainability Scores
-                st.markdown("### Sustainability Scores")
-                
-                # Create two columns for a more compact display
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Sustainability radar chart
-                    gemini_cols = [
-                        'gemini_scores.documentation_quality',
-                        'gemini_scores.testing_robustness',
-                        'gemini_scores.modularity_and_design',
-                        'gemini_scores.error_handling',
-                        'gemini_scores.security_best_practices',
-                        'gemini_scores.scalability_potential',
-                        'gemini_scores.environmental_efficiency',
-                        'gemini_scores.social_inclusiveness'
-                    ]
-                    
-                    categories = [col.split('.')[-1].replace('_', ' ').title() for col in gemini_cols]
-                    values = [repo_data[col] for col in gemini_cols]
-                    
-                    fig = go.Figure()
-                    fig.add_trace(go.Scatterpolar(
-                        r=values + [values[0]],
-                        theta=categories + [categories[0]],
-                        fill='toself',
-                        line_color='rgba(0, 128, 0, 0.8)',
-                        fillcolor='rgba(0, 128, 0, 0.3)'
-                    ))
-                    
-                    fig.update_layout(
-                        polar=dict(
-                            radialaxis=dict(visible=True, range=[0, 100]),
-                            bgcolor='rgba(0, 0, 0, 0.8)'
-                        ),
-                        showlegend=False,
-                        title="Sustainability Dimension Scores",
-                        template="plotly_dark",
-                        height=400
-                    )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with col2:
-                    # Display individual scores in a table
-                    score_data = []
-                    for col in gemini_cols:
-                        score_data.append({
-                            "Dimension": col.split('.')[-1].replace('_', ' ').title(),
-                            "Score": repo_data[col]
-                        })
-                    
-                    score_df = pd.DataFrame(score_data)
-                    
-                    # Add a color coding based on score
-                    def color_code(val):
-                        if val >= 80:
-                            return 'background-color: #c6efce; color: #006100'  # Green
-                        elif val >= 60:
-                            return 'background-color: #ffeb9c; color: #9c5700'  # Yellow
-                        else:
-                            return 'background-color: #ffc7ce; color: #9c0006'  # Red
-                    
-                    st.dataframe(score_df.style.applymap(color_code, subset=['Score']), use_container_width=True)
-                    
-                    # Critical Issues and Improvement Suggestions
-                    if 'gemini_scores.critical_issues' in repo_data and repo_data['gemini_scores.critical_issues']:
-                        issues = repo_data['gemini_scores.critical_issues']
-                        if isinstance(issues, str):
-                            issues = json.loads(issues)
-                        
-                        if issues:
-                            st.markdown("#### Top Critical Issues")
-                            for issue in issues[:3]:  # Show top 3 issues
-                                st.markdown(f"- {issue}")
-                    
-                    if 'gemini_scores.improvement_suggestions' in repo_data and repo_data['gemini_scores.improvement_suggestions']:
-                        suggestions = repo_data['gemini_scores.improvement_suggestions']
-                        if isinstance(suggestions, str):
-                            suggestions = json.loads(suggestions)
-                        
-                        if suggestions:
-                            st.markdown("#### Top Improvement Suggestions")
-                            for suggestion in suggestions[:3]:  # Show top 3 suggestions
-                                st.markdown(f"- {suggestion}")
-                
-                # Code Metrics Details
-                st.markdown("### Code Metrics Details")
-                
-                # Create tabs for different metric categories
-                code_tabs = st.tabs(["Quality", "Complexity", "Testing", "Structure"])
-                
-                with code_tabs[0]:  # Quality
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Sustainable practices
-                        st.markdown("#### Sustainable Code Practices")
-                        sustainable_cols = [col for col in repo_data.index if col.startswith('code_analysis.sustainable.')]
-                        
-                        if sustainable_cols:
-                            sustainable_data = pd.DataFrame({
-                                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in sustainable_cols],
-                                'Value': [repo_data[col] for col in sustainable_cols]
-                            })
-                            st.dataframe(sustainable_data, use_container_width=True)
-                        else:
-                            st.info("No sustainable code metrics available")
-                    
-                    with col2:
-                        # Code smells and issues
-                        st.markdown("#### Code Smells & Issues")
-                        unsustainable_cols = [col for col in repo_data.index if col.startswith('code_analysis.unsustainable.')]
-                        
-                        if unsustainable_cols:
-                            unsustainable_data = pd.DataFrame({
-                                'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in unsustainable_cols],
-                                'Value': [repo_data[col] for col in unsustainable_cols]
-                            })
-                            st.dataframe(unsustainable_data, use_container_width=True)
-                        else:
-                            st.info("No code smell metrics available")
-                
-                with code_tabs[1]:  # Complexity
-                    # Complexity metrics
-                    complexity_cols = [
-                        'complexity_analysis.average',
-                        'complexity_analysis.max',
-                        'complexity_analysis.complex_functions',
-                        'complexity_analysis.maintainability_index'
-                    ]
-                    
-                    complexity_data = pd.DataFrame({
-                        'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in complexity_cols],
-                        'Value': [repo_data.get(col, 0) for col in complexity_cols]
-                    })
-                    
-                    fig = px.bar(
-                        complexity_data,
-                        x='Metric',
-                        y='Value',
-                        color='Metric',
-                        title="Code Complexity Metrics",
-                        template="plotly_white"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                with code_tabs[2]:  # Testing
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Test metrics
-                        st.markdown("#### Testing Metrics")
-                        test_cols = [
-                            'test_coverage.has_tests',
-                            'test_coverage.test_files',
-                            'test_coverage.test_to_code_ratio',
-                            'test_coverage.test_lines'
-                        ]
-                        
-                        test_data = pd.DataFrame({
-                            'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in test_cols],
-                            'Value': [repo_data.get(col, 0) for col in test_cols]
-                        })
-                        st.dataframe(test_data, use_container_width=True)
-                    
-                    with col2:
-                        # Test frameworks
-                        st.markdown("#### Testing Frameworks")
-                        frameworks = repo_data.get('test_coverage.test_frameworks', [])
-                        
-                        if frameworks:
-                            if isinstance(frameworks, str):
-                                frameworks = json.loads(frameworks)
-                            
-                            if frameworks:
-                                st.write(", ".join(frameworks))
-                            else:
-                                st.info("No testing frameworks detected")
-                        else:
-                            st.info("No testing framework data available")
-                
-                with code_tabs[3]:  # Structure
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Repository structure features
-                        st.markdown("#### Repository Structure")
-                        structure_cols = [
-                            'repo_structure.has_readme',
-                            'repo_structure.has_license',
-                            'repo_structure.has_gitignore',
-                            'repo_structure.has_ci_config',
-                            'repo_structure.has_dependency_manager',
-                            'repo_structure.has_docker',
-                            'repo_structure.has_contribution_guide',
-                            'repo_structure.has_code_of_conduct',
-                            'repo_structure.has_security_policy'
-                        ]
-                        
-                        structure_data = pd.DataFrame({
-                            'Feature': [col.split('.')[-1].replace('has_', '').replace('_', ' ').title() for col in structure_cols],
-                            'Present': ['✅' if repo_data.get(col, False) else '❌' for col in structure_cols]
-                        })
-                        st.dataframe(structure_data, use_container_width=True)
-                    
-                    with col2:
-                        # Architectural metrics
-                        st.markdown("#### Architecture Metrics")
-                        arch_cols = [
-                            'repo_structure.folder_depth',
-                            'repo_structure.dependency_count',
-                            'repo_structure.architecture_score'
-                        ]
-                        
-                        arch_data = pd.DataFrame({
-                            'Metric': [col.split('.')[-1].replace('_', ' ').title() for col in arch_cols],
-                            'Value': [repo_data.get(col, 0) for col in arch_cols]
-                        })
-                        st.dataframe(arch_data, use_container_width=True)
+            repo_idx = repo_index.get(selected_repo)
+            if repo_idx is not None:
+                render_repo_detail(repo_idx)
             else:
                 st.error("Repository details not found. Please select another repository.")
         else:
@@ -1,11 +1,12 @@
-import requests
+import asyncio
 import pandas as pd
-import datetime
 import time
 import os
-from tqdm import tqdm
+from urllib.parse import quote
+import httpx
+import orjson
+from tqdm.asyncio import tqdm
 from dotenv import load_dotenv
-import re
 
 # Load environment variables
 load_dotenv()
@@ -23,377 +24,422 @@ headers = {
     'Accept': 'application/json'
 }
 
-def parse_gitlab_date(date_str):
-    """Parse GitLab date string to datetime object, handling different formats"""
+# Maximum number of API requests in flight at once
+MAX_CONCURRENT_REQUESTS = 64
+REQUEST_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Rate limited (429) and transient server errors are retried with exponential backoff, honouring Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+
+# Requests are paused until the reset time once fewer than this many remain in the quota
+RATE_LIMIT_HEADROOM = 10
+# Epoch time until which requests are paused because the rate limit quota is (nearly) used up
+rate_limit_resume_at = 0.0
+
+def update_rate_limit(response):
+    """Pause all further requests until RateLimit-Reset once RateLimit-Remaining gets close to zero"""
+    global rate_limit_resume_at
+    remaining = response.headers.get('RateLimit-Remaining')
+    reset = response.headers.get('RateLimit-Reset')
+    if remaining is not None and reset and int(remaining) < RATE_LIMIT_HEADROOM:
+        rate_limit_resume_at = max(rate_limit_resume_at, float(reset))
+
+# Responses are cached on disk with their ETag so re-runs can use conditional requests.
+# A 304 Not Modified has no body, so unchanged pages cost (almost) no transfer.
+HTTP_CACHE_FILE = ".gitlab_http_cache.json"
+# Response headers needed to rebuild a cached page (pagination info and item count)
+CACHED_HEADERS = ('Link', 'X-Total', 'X-Total-Pages', 'X-Next-Page')
+
+def load_http_cache():
+    """Load the on-disk HTTP cache, or start with an empty one"""
     try:
-        dt = datetime.datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-    except ValueError:
-        # Fallback to regex parsing if needed
-        date_pattern = r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})'
-        match = re.search(date_pattern, date_str)
-        if match:
-            dt = datetime.datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S')
-        else:
-            raise ValueError("Date format not recognized")
-
-    # Ensure the datetime is timezone-aware. If tzinfo is None, assume UTC.
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=datetime.timezone.utc)
-    return dt
-
-def get_groups(parent_id=None):
-    """Get all groups from GitLab instance, optionally within a parent group"""
-    groups = []
-    page = 1
-    while True:
-        url = f'{GITLAB_URL}/api/v4/groups'
-        if parent_id:
-            url += f'?parent_id={parent_id}'
-        
-        url += f'{"&" if parent_id else "?"}per_page=100&page={page}'
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            print(f"Error fetching groups: {response.status_code}")
-            print(response.json())
-            break
-        
-        current_groups = response.json()
-        if not current_groups:
-            break
-            
-        groups.extend(current_groups)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-        
-    return groups
-
-def get_repos(group_id=None):
-    repos = []
-    page = 1
-    while True:
-        if group_id:
-            url = f'{GITLAB_URL}/api/v4/groups/{group_id}/projects?include_subgroups=true&per_page=100&page={page}'
-        else:
-            url = f'{GITLAB_URL}/api/v4/projects?per_page=100&page={page}'
-
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            print(f"Error fetching repos for group {group_id}: {response.status_code}")
-            print(response.json())
-            break
+        with open(HTTP_CACHE_FILE, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
 
-        current_repos = response.json()
-        if not current_repos:
-            break
+def save_http_cache():
+    """Persist the HTTP cache for the next run"""
+    with open(HTTP_CACHE_FILE, 'wb') as f:
+        f.write(orjson.dumps(HTTP_CACHE))
 
-        repos.extend(current_repos)
-        page += 1
+HTTP_CACHE = load_http_cache()
 
-        # Respect GitLab's rate limiting
-        time.sleep(1)
+def create_client():
+    """Create the HTTP/2 client shared by every API call, so concurrent requests are multiplexed over few connections"""
+    return httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=32),
+        timeout=30.0
+    )
 
-    return repos
+async def api_request(client, method, url, params=None, json=None, headers=None):
+    """Send an API request, retrying rate limited and transient errors"""
+    for attempt in range(MAX_RETRIES + 1):
+        # Only wait when the API has told us the quota is about to run out
+        delay = rate_limit_resume_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with REQUEST_SLOTS:
+            response = await client.request(method, url, params=params, json=json, headers=headers)
+        update_rate_limit(response)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(float(response.headers.get('Retry-After', 2 ** attempt)))
 
-def get_contributors(project_id):
-    """Get contributors for a repository"""
-    contributors = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/contributors?per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching contributors for project {project_id}: {response.status_code}")
-            break
-            
-        current_contributors = response.json()
-        if not current_contributors:
-            break
-            
-        contributors.extend(current_contributors)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-        
-    return contributors
+async def api_get(client, url, params=None):
+    """GET an API URL, retrying rate limited and transient errors.
+       When the response is cached from an earlier run, it is only re-downloaded if it changed.
+    """
+    cache_key = str(httpx.URL(url, params=params))
+    cached = HTTP_CACHE.get(cache_key)
+    response = await api_request(
+        client, 'GET', url, params,
+        headers={'If-None-Match': cached['etag']} if cached else None
+    )
 
-def get_issues(project_id):
-    """Get issues for a repository"""
-    all_issues = {'open': [], 'closed': []}
-    
-    # Get closed issues
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/issues?state=closed&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching closed issues for project {project_id}: {response.status_code}")
-            break
-            
-        current_issues = response.json()
-        if not current_issues:
-            break
-            
-        all_issues['closed'].extend(current_issues)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-    
-    # Get open issues
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/issues?state=opened&per_page=100&page={page}',
-            headers=headers
-        )
+    if response.status_code == 304:
+        # Unchanged since the last run: rebuild the response from the cache
+        return httpx.Response(200, headers=cached['headers'], text=cached['body'], request=response.request)
+    if response.status_code == 200 and 'ETag' in response.headers:
+        HTTP_CACHE[cache_key] = {
+            'etag': response.headers['ETag'],
+            'headers': {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+            'body': response.text
+        }
+    return response
+
+async def get_all_pages(client, url, params, what):
+    """Get every item of a paginated endpoint. Page 1 tells how many pages there are (X-Total-Pages),
+       then the remaining pages are all requested at once instead of one after the other.
+    """
+    params = {**params, 'per_page': 100}
+    response = await api_get(client, url, {**params, 'page': 1})
+    if response.status_code != 200:
+        print(f"Error fetching {what}: {response.status_code}")
+        return []
+    # orjson decodes the large issue and merge request pages several times faster than the stdlib json module
+    items = orjson.loads(response.content)
+
+    # GitLab leaves out X-Total-Pages for very large result sets (over 10,000 items),
+    # then the only way on is to follow the "next" link one page at a time
+    if 'X-Total-Pages' not in response.headers:
+        while 'next' in response.links:
+            response = await api_get(client, response.links['next']['url'])
+            if response.status_code != 200:
+                print(f"Error fetching {what}: {response.status_code}")
+                break
+            items.extend(orjson.loads(response.content))
+        return items
+
+    last_page = int(response.headers['X-Total-Pages'])
+    responses = await asyncio.gather(*(
+        api_get(client, url, {**params, 'page': page}) for page in range(2, last_page + 1)
+    ))
+    for response in responses:
         if response.status_code != 200:
-            print(f"Error fetching open issues for project {project_id}: {response.status_code}")
-            break
-            
-        current_issues = response.json()
-        if not current_issues:
-            break
-            
-        all_issues['open'].extend(current_issues)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-        
-    return all_issues
+            print(f"Error fetching {what}: {response.status_code}")
+            continue
+        items.extend(orjson.loads(response.content))
+    return items
+
+def parse_gitlab_dates(values):
+    """Parse GitLab date strings (ISO 8601) to timezone-aware timestamps, a whole column at once"""
+    return pd.to_datetime(values, utc=True, format='ISO8601')
+
+async def get_repos(client, group_id=None):
+    # statistics=true adds the commit count of each project (only returned with at least Reporter access)
+    if group_id:
+        url = f'{GITLAB_URL}/api/v4/groups/{group_id}/projects'
+        params = {'include_subgroups': 'true', 'statistics': 'true'}
+    else:
+        url = f'{GITLAB_URL}/api/v4/projects'
+        params = {'statistics': 'true'}
+    return await get_all_pages(client, url, params, f"repos for group {group_id}")
+
+async def get_contributors(client, project_id):
+    """Get contributors for a repository"""
+    return await get_all_pages(
+        client,
+        f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/contributors',
+        {},
+        f"contributors for project {project_id}"
+    )
 
-def get_merge_requests(project_id):
+async def get_issue_counts(client, project_id):
+    """Get the number of open and closed issues of a repository, without listing them"""
+    response = await api_get(client, f'{GITLAB_URL}/api/v4/projects/{project_id}/issues_statistics')
+    if response.status_code != 200:
+        print(f"Error fetching issue statistics for project {project_id}: {response.status_code}")
+        return {'opened': 0, 'closed': 0}
+    return orjson.loads(response.content)['statistics']['counts']
+
+async def get_closed_issues(client, project_id):
+    """Get closed issues for a repository (needed for their resolution time)"""
+    return await get_all_pages(
+        client,
+        f'{GITLAB_URL}/api/v4/projects/{project_id}/issues',
+        {'state': 'closed'},
+        f"closed issues for project {project_id}"
+    )
+
+async def get_merge_requests(client, project_id):
     """Get merge requests for a repository (GitLab equivalent of pull requests)"""
-    all_mrs = {'open': [], 'closed': []}
-    
-    # Get closed MRs
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/merge_requests?state=closed&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching closed MRs for project {project_id}: {response.status_code}")
-            break
-            
-        current_mrs = response.json()
-        if not current_mrs:
-            break
-            
-        all_mrs['closed'].extend(current_mrs)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-    
-    # Get open MRs
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/merge_requests?state=opened&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching open MRs for project {project_id}: {response.status_code}")
-            break
-            
-        current_mrs = response.json()
-        if not current_mrs:
-            break
-            
-        all_mrs['open'].extend(current_mrs)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-        
-    return all_mrs
+    url = f'{GITLAB_URL}/api/v4/projects/{project_id}/merge_requests'
+    # Closed and open MRs are fetched concurrently
+    closed, opened = await asyncio.gather(
+        get_all_pages(client, url, {'state': 'closed'}, f"closed MRs for project {project_id}"),
+        get_all_pages(client, url, {'state': 'opened'}, f"open MRs for project {project_id}")
+    )
+    return {'open': opened, 'closed': closed}
 
-def get_commits(project_id):
+async def get_commits(client, project_id):
     """Get commits for a repository"""
-    commits = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/commits?per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching commits for project {project_id}: {response.status_code}")
-            break
-            
-        current_commits = response.json()
-        if not current_commits:
-            break
-            
-        commits.extend(current_commits)
-        page += 1
-        
-        # Respect GitLab's rate limiting
-        time.sleep(1)
-        
-    return commits
+    return await get_all_pages(
+        client,
+        f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/commits',
+        {},
+        f"commits for project {project_id}"
+    )
+
+async def get_commit_summary(client, repo):
+    """Get the most recent commit of a repository and its number of commits, without listing every commit"""
+    project_id = repo['id']
+    commit_count = repo.get('statistics', {}).get('commit_count')
+    if commit_count == 0:
+        return None, 0
+
+    # Commits are returned newest first, so the first one of a single item page is the latest
+    response = await api_get(
+        client, f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/commits', {'per_page': 1}
+    )
+    if response.status_code != 200:
+        print(f"Error fetching commits for project {project_id}: {response.status_code}")
+        return None, commit_count or 0
+    commits = orjson.loads(response.content)
+
+    if commit_count is None:
+        # Without project statistics the number of commits comes from the pagination header.
+        # GitLab leaves X-Total out above 10,000 items, then the commits are counted from the full list.
+        total = response.headers.get('X-Total')
+        commit_count = int(total) if total else len(await get_commits(client, project_id))
+    return (commits[0] if commits else None), commit_count
 
-def check_file_exists(project_id, file_path):
+async def check_file_exists(client, project_id, file_path, ref):
     """Check if a file exists in a repository"""
     # URL encode the file path for the API
-    encoded_path = requests.utils.quote(file_path, safe='')
-    
-    response = requests.get(
-        f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/files/{encoded_path}?ref=master',
-        headers=headers
+    encoded_path = quote(file_path, safe='')
+    # HEAD returns only the file metadata headers, not the base64 encoded content
+    response = await api_request(
+        client, 'HEAD',
+        f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/files/{encoded_path}',
+        {'ref': ref}
     )
-    if response.status_code != 200:
-        # Try with main branch if master doesn't exist
-        response = requests.get(
-            f'{GITLAB_URL}/api/v4/projects/{project_id}/repository/files/{encoded_path}?ref=main',
-            headers=headers
-        )
     return response.status_code == 200
 
-def get_ci_pipelines(project_id):
-    """Check if the repository has CI/CD pipelines"""
-    response = requests.get(
-        f'{GITLAB_URL}/api/v4/projects/{project_id}/pipelines',
-        headers=headers
+# Documentation files looked up in every repository
+DOCUMENTATION_FILES = ('README.md', 'LICENSE', 'CONTRIBUTING.md')
+
+# Looks up several files of a repository at once
+BLOBS_QUERY = """
+query($fullPath: ID!, $paths: [String!]!, $ref: String) {
+  project(fullPath: $fullPath) {
+    repository { blobs(paths: $paths, ref: $ref) { nodes { path } } }
+  }
+}
+"""
+
+async def get_documentation_files(client, repo):
+    """Get which of the documentation files exist on the default branch, with a single GraphQL query"""
+    ref = repo.get('default_branch')
+    if not ref:
+        # No default branch means an empty repository
+        return set()
+
+    response = await api_request(
+        client, 'POST', f'{GITLAB_URL}/api/graphql',
+        json={
+            'query': BLOBS_QUERY,
+            'variables': {'fullPath': repo['path_with_namespace'], 'paths': list(DOCUMENTATION_FILES), 'ref': ref}
+        }
     )
+    project = (orjson.loads(response.content).get('data') or {}).get('project') if response.status_code == 200 else None
+    if project and project.get('repository'):
+        return {node['path'] for node in project['repository']['blobs']['nodes']}
+
+    # GraphQL not available (e.g. disabled on the instance), check the files one by one over REST
+    exists = await asyncio.gather(*(
+        check_file_exists(client, repo['id'], path, ref) for path in DOCUMENTATION_FILES
+    ))
+    return {path for path, found in zip(DOCUMENTATION_FILES, exists) if found}
+
+async def get_ci_pipelines(client, project_id):
+    """Check if the repository has CI/CD pipelines"""
+    # Only whether there is any pipeline matters, so a single one is enough
+    response = await api_get(client, f'{GITLAB_URL}/api/v4/projects/{project_id}/pipelines', {'per_page': 1})
     if response.status_code != 200:
         return []
-    return response.json()
+    return orjson.loads(response.content)
+
+async def fetch_repo_data(client, repo):
+    """Fetch everything the metrics of a repository are based on, all endpoints concurrently"""
+    project_id = repo['id']
+    (
+        contributors, issue_counts, closed_issues, mrs, (latest_commit, commit_count), documentation_files, pipelines
+    ) = await asyncio.gather(
+        get_contributors(client, project_id),
+        get_issue_counts(client, project_id),
+        get_closed_issues(client, project_id),
+        get_merge_requests(client, project_id),
+        get_commit_summary(client, repo),
+        get_documentation_files(client, repo),
+        get_ci_pipelines(client, project_id)
+    )
+    return {
+        'contributors': contributors,
+        'issue_counts': issue_counts,
+        'closed_issues': closed_issues,
+        'mrs': mrs,
+        'latest_commit': latest_commit,
+        'commit_count': commit_count,
+        'documentation_files': documentation_files,
+        'pipelines': pipelines
+    }
+
+def build_metrics(repos, repo_data, group_name, org_id):
+    """Calculate the sustainability metrics of all repositories at once from their fetched data"""
+    current_date = pd.Timestamp.now(tz='UTC')
+    project_ids = [repo['id'] for repo in repos]
+    repo_full_paths = pd.Series([repo['path_with_namespace'] for repo in repos], index=project_ids)
 
-def calculate_metrics(repos, group_name, org_id):
+    # Issue resolution time (in hours) of every closed issue, averaged per repository
+    closed_issues = pd.DataFrame(
+        [(project_id, issue.get('created_at'), issue.get('closed_at'))
+         for project_id, data in zip(project_ids, repo_data) for issue in data['closed_issues']],
+        columns=['project_id', 'created_at', 'closed_at']
+    ).dropna()
+    resolution_times = (
+        parse_gitlab_dates(closed_issues['closed_at']) - parse_gitlab_dates(closed_issues['created_at'])
+    ).dt.total_seconds() / 3600
+    avg_issue_resolution_time = resolution_times.groupby(closed_issues['project_id']).mean().reindex(project_ids)
+
+    # One row per merge request (GitLab equivalent of pull request), open and closed
+    mrs = pd.DataFrame(
+        [(project_id, state == 'closed', mr.get('state'), (mr.get('author') or {}).get('username', ''))
+         for project_id, data in zip(project_ids, repo_data)
+         for state in ('closed', 'open') for mr in data['mrs'][state]],
+        columns=['project_id', 'closed', 'state', 'author']
+    )
+    # Contributions are external when the author is not the owning namespace of the repository
+    owner_namespace = mrs['project_id'].map(repo_full_paths.str.split('/').str[0])
+    mr_counts = pd.DataFrame({
+        'total': 1,
+        'closed': mrs['closed'],
+        'merged': mrs['closed'] & (mrs['state'] == 'merged'),
+        'external': mrs['author'] != owner_namespace
+    }).groupby(mrs['project_id']).sum().reindex(project_ids, fill_value=0)
+
+    # Per repository values taken as they are
+    repo_values = pd.DataFrame({
+        'num_contributors': [len(data['contributors']) for data in repo_data],
+        'total_commits': [data['commit_count'] for data in repo_data],
+        'last_commit_date': [data['latest_commit']['created_at'] if data['latest_commit'] else None for data in repo_data],
+        'open_issues': [data['issue_counts']['opened'] for data in repo_data],
+        'closed_issues': [data['issue_counts']['closed'] for data in repo_data],
+        'has_readme': ['README.md' in data['documentation_files'] for data in repo_data],
+        'has_license': ['LICENSE' in data['documentation_files'] for data in repo_data],
+        'has_contributing': ['CONTRIBUTING.md' in data['documentation_files'] for data in repo_data],
+        'has_cicd': [len(data['pipelines']) > 0 for data in repo_data]
+    }, index=project_ids)
+
+    repo_created_at = parse_gitlab_dates(pd.Series([repo['created_at'] for repo in repos], index=project_ids))
+    repo_age_days = (current_date - repo_created_at).dt.days
+    repo_age_months = repo_age_days / 30.44  # Average days in a month
+    last_commit_date = parse_gitlab_dates(repo_values['last_commit_date'])
+    total_issues = repo_values['open_issues'] + repo_values['closed_issues']
+
+    return pd.DataFrame({
+        'organization': org_id,
+        'group_name': group_name,
+        'repo_name': [repo['name'] for repo in repos],
+        'repo_full_path': repo_full_paths.to_numpy(),
+
+        # Activity & Maintenance Metrics
+        'repo_age_days': repo_age_days.to_numpy(),
+        'repo_age_months': repo_age_months.to_numpy(),
+        'commit_frequency_per_month': (repo_values['total_commits'] / repo_age_months).where(repo_age_months > 0, 0).to_numpy(),
+        'avg_issue_resolution_time_hours': avg_issue_resolution_time.to_numpy(),
+        'open_issues_percentage': (repo_values['open_issues'] / total_issues * 100).where(total_issues > 0, 0).to_numpy(),
+        'last_commit_date': last_commit_date.to_numpy(),
+        'days_since_last_commit': (current_date - last_commit_date).dt.days.to_numpy(),
+
+        # Collaboration & Community Engagement
+        'num_contributors': repo_values['num_contributors'].to_numpy(),
+        'num_forks': [repo.get('forks_count', 0) for repo in repos],
+        'num_stars': [repo.get('star_count', 0) for repo in repos],
+        'merged_pr_percentage': (mr_counts['merged'] / mr_counts['total'] * 100).where(mr_counts['total'] > 0, 0).to_numpy(),
+        'external_pr_percentage': (mr_counts['external'] / mr_counts['total'] * 100).where(mr_counts['total'] > 0, 0).to_numpy(),
+
+        # Code & Documentation Quality
+        'has_readme': repo_values['has_readme'].to_numpy(),
+        'has_license': repo_values['has_license'].to_numpy(),
+        'has_contributing': repo_values['has_contributing'].to_numpy(),
+        'has_cicd': repo_values['has_cicd'].to_numpy(),
+
+        # Raw counts for reference
+        'total_commits': repo_values['total_commits'].to_numpy(),
+        'open_issues': repo_values['open_issues'].to_numpy(),
+        'closed_issues': repo_values['closed_issues'].to_numpy(),
+        'open_prs': (mr_counts['total'] - mr_counts['closed']).to_numpy(),
+        'closed_prs': mr_counts['closed'].to_numpy()
+    })
+
+async def calculate_metrics(client, repos, group_name, org_id):
     """Calculate sustainability metrics for each repository"""
-    metrics = []
-    current_date = current_date = datetime.datetime.now(datetime.timezone.utc)
-    
-    for repo in tqdm(repos, desc=f"Processing {group_name} repositories"):
-        project_id = repo['id']
-        repo_full_path = repo['path_with_namespace']
-        
-        # Parse the created_at date
-        repo_created_at = parse_gitlab_date(repo['created_at'])
-        repo_age_days = (current_date - repo_created_at).days
-        repo_age_months = repo_age_days / 30.44  # Average days in a month
-        
-        # Get additional data
-        contributors = get_contributors(project_id)
-        issues = get_issues(project_id)
-        mrs = get_merge_requests(project_id)
-        commits = get_commits(project_id)
-        
-        # Calculate issue resolution time
-        issue_resolution_times = []
-        for issue in issues['closed']:
-            if 'created_at' in issue and 'closed_at' in issue:
-                created_at = parse_gitlab_date(issue['created_at'])
-                closed_at = parse_gitlab_date(issue['closed_at'])
-                resolution_time = (closed_at - created_at).total_seconds() / 3600  # in hours
-                issue_resolution_times.append(resolution_time)
-        
-        avg_issue_resolution_time = sum(issue_resolution_times) / len(issue_resolution_times) if issue_resolution_times else None
-        
-        # Calculate last commit date
-        last_commit_date = None
-        last_commit_age = None
-        if commits:
-            last_commit_date_str = commits[0]['created_at']
-            last_commit_date = parse_gitlab_date(last_commit_date_str)
-            last_commit_age = (current_date - last_commit_date).days
-        
-        # Check for documentation files
-        has_readme = check_file_exists(project_id, 'README.md')
-        has_license = check_file_exists(project_id, 'LICENSE')
-        has_contributing = check_file_exists(project_id, 'CONTRIBUTING.md')
-        
-        # Check for CI/CD
-        has_cicd = len(get_ci_pipelines(project_id)) > 0
-        
-        # Calculate percentage of external contributions
-        owner_namespace = repo_full_path.split('/')[0]
-        external_mrs = [mr for mr in mrs['closed'] + mrs['open'] 
-                       if mr.get('author', {}).get('username', '') != owner_namespace]
-        external_mr_percentage = len(external_mrs) / len(mrs['closed'] + mrs['open']) * 100 if len(mrs['closed'] + mrs['open']) > 0 else 0
-        
-        # Gather metrics
-        repo_metrics = {
-            'organization': org_id,
-            'group_name': group_name,
-            'repo_name': repo['name'],
-            'repo_full_path': repo_full_path,
-            
-            # Activity & Maintenance Metrics
-            'repo_age_days': repo_age_days,
-            'repo_age_months': repo_age_months,
-            'commit_frequency_per_month': len(commits) / repo_age_months if repo_age_months > 0 else 0,
-            'avg_issue_resolution_time_hours': avg_issue_resolution_time,
-            'open_issues_percentage': len(issues['open']) / (len(issues['open']) + len(issues['closed'])) * 100 if (len(issues['open']) + len(issues['closed'])) > 0 else 0,
-            'last_commit_date': last_commit_date,
-            'days_since_last_commit': last_commit_age,
-            
-            # Collaboration & Community Engagement
-            'num_contributors': len(contributors),
-            'num_forks': repo.get('forks_count', 0),
-            'num_stars': repo.get('star_count', 0),
-            'merged_pr_percentage': len([mr for mr in mrs['closed'] if mr.get('state') == 'merged']) / (len(mrs['closed']) + len(mrs['open'])) * 100 if (len(mrs['closed']) + len(mrs['open'])) > 0 else 0,
-            'external_pr_percentage': external_mr_percentage,
-            
-            # Code & Documentation Quality
-            'has_readme': has_readme,
-            'has_license': has_license,
-            'has_contributing': has_contributing,
-            'has_cicd': has_cicd,
-            
-            # Raw counts for reference
-            'total_commits': len(commits),
-            'open_issues': len(issues['open']),
-            'closed_issues': len(issues['closed']),
-            'open_prs': len(mrs['open']),
-            'closed_prs': len(mrs['closed'])
-        }
-        
-        metrics.append(repo_metrics)
-        
-    return metrics
+    # All repositories are fetched concurrently, the request semaphore keeps the load on GitLab bounded
+    repo_data = await tqdm.gather(
+        *(fetch_repo_data(client, repo) for repo in repos),
+        desc=f"Processing {group_name} repositories"
+    )
+    return build_metrics(repos, repo_data, group_name, org_id)
 
 def load_existing_metrics(file_path):
     """Load existing metrics from a CSV file if it exists"""
     if os.path.exists(file_path):
-        return pd.read_csv(file_path)
+        # The multithreaded Arrow CSV parser is much faster than the default one on large files
+        return pd.read_csv(file_path, engine='pyarrow')
     return None
 
 def save_metrics(metrics, file_path):
-    """Append new metrics to the existing CSV file instead of overwriting"""
+    """Append new metrics to the existing CSV file instead of overwriting.
+       Rows of repositories that were scraped before are replaced once all groups are done (dedupe_metrics).
+    """
     new_df = pd.DataFrame(metrics)
+    # Only a new file gets the header row
+    new_df.to_csv(file_path, mode='a', header=not os.path.exists(file_path), index=False)
+    return len(new_df)
 
-    # If the file exists, append data without overwriting
-    if os.path.exists(file_path):
-        existing_df = pd.read_csv(file_path)
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        combined_df.drop_duplicates(subset=['repo_full_path', 'organization'], keep='last', inplace=True)
-        combined_df.to_csv(file_path, index=False)
-        return len(new_df), len(combined_df)
-    else:
-        # If the file doesn't exist, create it
-        new_df.to_csv(file_path, index=False)
-        return len(new_df), len(new_df)
+def dedupe_metrics(file_path):
+    """Keep only the latest metrics of each repository in the CSV file"""
+    existing_df = load_existing_metrics(file_path)
+    if existing_df is None:
+        return 0
+    duplicated = existing_df.duplicated(subset=['repo_full_path', 'organization'], keep='last')
+    if duplicated.any():
+        existing_df = existing_df[~duplicated]
+        existing_df.to_csv(file_path, index=False)
+    return len(existing_df)
 
-def process_group(group_id, group_name, org_id, output_file):
+async def process_group(client, group_id, group_name, org_id, output_file):
     """Process a single GitLab group and add to the combined dataset"""
     print(f"Fetching repositories for group '{group_name}' (ID: {group_id})...")
-    repos = get_repos(group_id)
+    repos = await get_repos(client, group_id)
     print(f"Found {len(repos)} repositories in group {group_name}.")
     
     print(f"Calculating sustainability metrics for {group_name}...")
-    metrics = calculate_metrics(repos, group_name, org_id)
+    metrics = await calculate_metrics(client, repos, group_name, org_id)
     
     # Create data directory if it doesn't exist
     if not os.path.exists('data'):
@@ -401,63 +447,26 @@ def process_group(group_id, group_name, org_id, output_file):
         print("Created 'data' directory")
     
     # Save metrics to the combined file
-    new_count, total_count = save_metrics(metrics, output_file)
-    print(f"Added {new_count} repositories from group {group_name} to dataset. Total repositories: {total_count}")
+    new_count = save_metrics(metrics, output_file)
+    print(f"Added {new_count} repositories from group {group_name} to dataset.")
     
     return metrics
 
-def find_group_by_path(path):
-    """Find a GitLab group by its path"""
-    parts = path.strip('/').split('/')
-    parent_id = None
-    group_id = None
-    
-    # Navigate through the path to find the group
-    for part in parts:
-        url = f'{GITLAB_URL}/api/v4/groups'
-        if parent_id:
-            url += f'?parent_id={parent_id}'
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            print(f"Error searching for group: {response.status_code}")
-            return None
-        
-        groups = response.json()
-        matching_group = next((g for g in groups if g['path'] == part), None)
-        
-        if not matching_group:
-            print(f"Group part '{part}' not found in path '{path}'")
-            return None
-        
-        group_id = matching_group['id']
-        parent_id = group_id
-    
-    return group_id
-
-def find_group_by_path_direct(path):
+async def find_group_by_path_direct(client, path):
     """Find a GitLab group by directly querying its full path"""
     # URL encode the path for the API
-    encoded_path = requests.utils.quote(path, safe='')
+    encoded_path = quote(path, safe='')
     
-    response = requests.get(
-        f'{GITLAB_URL}/api/v4/groups/{encoded_path}',
-        headers=headers
-    )
+    response = await api_get(client, f'{GITLAB_URL}/api/v4/groups/{encoded_path}')
     
     if response.status_code == 200:
-        return response.json()['id']
+        return orjson.loads(response.content)['id']
     else:
         print(f"Group not found with path: {path}")
         print(f"Status code: {response.status_code}")
-        # Try listing all groups if the token has sufficient permissions
-        all_groups = get_groups()
-        print(f"Found {len(all_groups)} groups in total")
-        for group in all_groups:
-            print(f"Available group: {group['full_path']} (ID: {group['id']})")
         return None
 
-def main():
+async def main():
     """Main function to process GitLab groups"""
     # Define output file path
     output_file = "data/gitlab_repos_sustainability_metrics.csv"
@@ -470,29 +479,30 @@ def main():
         # Add more groups/organizations as needed
     ]
     
-    # Process each group
-    for group_path, org_id in groups:
-        # Try to find the group ID based on path
-        print(f"Searching for group with path: {group_path}")
-        
-        # Try the direct path lookup first
-        group_id = find_group_by_path_direct(group_path)
-        
-        # If that fails, try hierarchical lookup
-        if not group_id:
-            group_id = find_group_by_path(group_path)
-        
-        if group_id:
-            print(f"Found group ID: {group_id}")
-            process_group(group_id, group_path, org_id, output_file)
-        else:
-            print(f"Could not find group with path: {group_path}")
-            print("Proceeding to the next group...")
-    
-    print(f"All metrics saved to {output_file}")
+    # Process each group (the client is closed once all groups are done)
+    async with create_client() as client:
+        for group_path, org_id in groups:
+            # Try to find the group ID based on path
+            print(f"Searching for group with path: {group_path}")
+        
+            # The full path (e.g. "parent/child") identifies the group in a single request
+            group_id = await find_group_by_path_direct(client, group_path)
+        
+            if group_id:
+                print(f"Found group ID: {group_id}")
+                await process_group(client, group_id, group_path, org_id, output_file)
+            else:
+                print(f"Could not find group with path: {group_path}")
+                print("Proceeding to the next group...")
+
+    save_http_cache()
+
+    # Metrics of repositories that were scraped again replace the old ones
+    total_count = dedupe_metrics(output_file)
+    print(f"All metrics saved to {output_file}. Total repositories: {total_count}")
 
 if __name__ == "__main__":
     # Note: Anonymous access is used when no token is provided
     if not TOKEN:
         print("No GitLab API token provided. Using anonymous access (limited rate limits and features).")
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
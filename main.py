@@ -1,9 +1,12 @@
-import requests
+import asyncio
 import pandas as pd
 import datetime
 import time
 import os
-from tqdm import tqdm
+from urllib.parse import urlparse, parse_qs
+import httpx
+import orjson
+from tqdm.asyncio import tqdm
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,297 +16,447 @@ load_dotenv()
 # Store this in a .env file as GITHUB_TOKEN=your_token_here
 TOKEN = os.getenv('GITHUB_TOKEN')
 
+# Set the GitHub API base URL
+GITHUB_API = "https://api.github.com"
+
 # Headers for GitHub API requests
 headers = {
-    'Authorization': f'token {TOKEN}',
     'Accept': 'application/vnd.github.v3+json'
 }
+if TOKEN:
+    headers['Authorization'] = f'token {TOKEN}'
 
-def get_repos(org):
-    """Get all repositories for an organization"""
-    repos = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/orgs/{org}/repos?per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching repos for {org}: {response.status_code}")
-            print(response.json())
-            break
-        
-        current_repos = response.json()
-        if not current_repos:
-            break
-            
-        repos.extend(current_repos)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-        
-    return repos
-
-def get_contributors(repo_full_name):
-    """Get contributors for a repository"""
-    contributors = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/contributors?per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching contributors for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_contributors = response.json()
-        if not current_contributors:
-            break
-            
-        contributors.extend(current_contributors)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-        
-    return contributors
+# Maximum number of API requests in flight at once
+MAX_CONCURRENT_REQUESTS = 32
+REQUEST_SLOTS = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
-def get_issues(repo_full_name):
-    """Get closed issues for a repository"""
-    all_issues = []
-    
-    # Get closed issues
-    closed_issues = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/issues?state=closed&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching closed issues for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_issues = response.json()
-        if not current_issues:
-            break
-            
-        closed_issues.extend(current_issues)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-    
-    # Get open issues
-    open_issues = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/issues?state=open&per_page=100&page={page}',
-            headers=headers
+# Transient server errors are retried with exponential backoff, throttled requests after their Retry-After
+RETRY_STATUSES = {500, 502, 503, 504}
+MAX_RETRIES = 5
+
+# Requests are paused until the reset time once fewer calls than can be in flight remain in the quota
+RATE_LIMIT_HEADROOM = MAX_CONCURRENT_REQUESTS
+# Epoch time until which requests are paused because the rate limit quota is (nearly) used up
+rate_limit_resume_at = 0.0
+
+def update_rate_limit(response):
+    """Pause all further requests until X-RateLimit-Reset once X-RateLimit-Remaining gets close to zero"""
+    global rate_limit_resume_at
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    reset = response.headers.get('X-RateLimit-Reset')
+    if remaining is not None and reset and int(remaining) < RATE_LIMIT_HEADROOM:
+        rate_limit_resume_at = max(rate_limit_resume_at, float(reset))
+
+# Responses are cached on disk with their ETag so re-runs can use conditional requests.
+# A 304 Not Modified has no body and does not count against GitHub's rate limit.
+HTTP_CACHE_FILE = ".github_http_cache.json"
+# Response headers needed to rebuild a cached page (pagination info)
+CACHED_HEADERS = ('Link',)
+# Cached responses younger than this (in seconds) are reused without asking GitHub at all
+HTTP_CACHE_MAX_AGE = 3600
+
+def load_http_cache():
+    """Load the on-disk HTTP cache, or start with an empty one"""
+    try:
+        with open(HTTP_CACHE_FILE, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_http_cache():
+    """Persist the HTTP cache for the next run"""
+    with open(HTTP_CACHE_FILE, 'wb') as f:
+        f.write(orjson.dumps(HTTP_CACHE))
+
+HTTP_CACHE = load_http_cache()
+
+def cached_response(url, cached):
+    """Rebuild a response from the HTTP cache"""
+    return httpx.Response(200, headers=cached['headers'], text=cached['body'], request=httpx.Request('GET', url))
+
+def create_client():
+    """Create the HTTP/2 client shared by every API call, so concurrent requests are multiplexed over few connections"""
+    return httpx.AsyncClient(
+        http2=True,
+        headers=headers,
+        limits=httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=MAX_CONCURRENT_REQUESTS),
+        timeout=30.0
+    )
+
+async def gh_request(client, method, url, json=None, headers=None):
+    """Send a request to the GitHub API, waiting only when the rate limit is (nearly) used up"""
+    for attempt in range(MAX_RETRIES + 1):
+        delay = rate_limit_resume_at - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with REQUEST_SLOTS:
+            response = await client.request(method, url, json=json, headers=headers)
+        update_rate_limit(response)
+
+        # The secondary rate limit answers 403 (or 429) with a Retry-After header
+        throttled = response.status_code in (403, 429) and (
+            'Retry-After' in response.headers or rate_limit_resume_at > time.time()
         )
-        if response.status_code != 200:
-            print(f"Error fetching open issues for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_issues = response.json()
-        if not current_issues:
-            break
-            
-        open_issues.extend(current_issues)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-        
-    all_issues = {'open': open_issues, 'closed': closed_issues}
-    return all_issues
+        if not (throttled or response.status_code in RETRY_STATUSES) or attempt == MAX_RETRIES:
+            return response
+        await asyncio.sleep(float(response.headers.get('Retry-After', 2 ** attempt)))
+
+# Requests made during this run by URL, so a URL is requested at most once per run
+# (callers asking for the same URL at the same time wait for the same request)
+RUN_REQUESTS = {}
+
+def gh_get(client, url):
+    """GET a GitHub API URL, at most once per run"""
+    if url not in RUN_REQUESTS:
+        RUN_REQUESTS[url] = asyncio.ensure_future(fetch_url(client, url))
+    return RUN_REQUESTS[url]
+
+async def fetch_url(client, url):
+    """GET a GitHub API URL.
+       A response cached by an earlier run is reused as is within HTTP_CACHE_MAX_AGE,
+       after that it is only re-downloaded if it changed.
+    """
+    cached = HTTP_CACHE.get(url)
+    if cached and time.time() - cached.get('fetched_at', 0) < HTTP_CACHE_MAX_AGE:
+        return cached_response(url, cached)
+
+    response = await gh_request(client, 'GET', url, headers={'If-None-Match': cached['etag']} if cached else None)
+
+    if response.status_code == 304:
+        # Unchanged since the last run
+        cached['fetched_at'] = time.time()
+        return cached_response(url, cached)
+    if response.status_code == 200 and 'ETag' in response.headers:
+        HTTP_CACHE[url] = {
+            'fetched_at': time.time(),
+            'etag': response.headers['ETag'],
+            'headers': {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+            'body': response.text
+        }
+    return response
+
+def minimal_item(item):
+    """Keep only the fields of an issue or pull request that the metrics use (drops bodies, labels, reactions, ...)"""
+    return {
+        'state': item['state'],
+        'created_at': item['created_at'],
+        'closed_at': item.get('closed_at'),
+        'user': {'login': (item.get('user') or {}).get('login')}
+    }
+
+def parse_github_date(date_str):
+    """Parse a GitHub timestamp (UTC, e.g. 2024-01-31T12:00:00Z) to a naive datetime"""
+    # fromisoformat is implemented in C and several times faster than strptime
+    return datetime.datetime.fromisoformat(date_str.replace('Z', '+00:00')).replace(tzinfo=None)
+
+def last_page_number(response):
+    """Page number of a listing's rel="last" link, or None if it has only one page"""
+    last = response.links.get('last')
+    return int(parse_qs(urlparse(last['url']).query)['page'][0]) if last else None
+
+async def get_all_pages(client, url, what):
+    """Get all items of a paginated listing: page 1 tells how many pages there are, the rest is fetched in parallel"""
+    response = await gh_get(client, f'{url}&page=1')
+    if response.status_code != 200:
+        print(f"Error fetching {what}: {response.status_code}")
+        return []
+    # orjson decodes the large issue and PR pages several times faster than the stdlib json module
+    items = orjson.loads(response.content)
+
+    last_page = last_page_number(response)
+    if last_page:
+        # gather keeps the pages in order
+        responses = await asyncio.gather(*(gh_get(client, f'{url}&page={page}') for page in range(2, last_page + 1)))
+        for response in responses:
+            if response.status_code != 200:
+                print(f"Error fetching {what}: {response.status_code}")
+                break
+            items.extend(orjson.loads(response.content))
+    return items
+
+async def get_repos(client, org):
+    """Get all repositories for an organization"""
+    return await get_all_pages(client, f'{GITHUB_API}/orgs/{org}/repos?per_page=100', f"repos for {org}")
+
+def count_from_last_page(response, items):
+    """Number of items of a listing requested with per_page=1, which is the number of its last page"""
+    return last_page_number(response) or len(items)
 
-def get_pull_requests(repo_full_name):
+async def get_contributor_count(client, repo_full_name):
+    """Get the number of contributors of a repository, without listing them"""
+    response = await gh_get(
+        client,
+        f'{GITHUB_API}/repos/{repo_full_name}/contributors?per_page=1'
+    )
+    if response.status_code != 200:
+        print(f"Error fetching contributors for {repo_full_name}: {response.status_code}")
+        return 0
+    return count_from_last_page(response, orjson.loads(response.content))
+
+async def get_issues(client, repo_full_name):
+    """Get open and closed issues for a repository"""
+    # Open and closed issues come in one sweep (state=all) and are split afterwards.
+    # GitHub's issues endpoint also lists pull requests, those are counted separately.
+    all_issues = [
+        minimal_item(issue)
+        for issue in await get_all_pages(client, f'{GITHUB_API}/repos/{repo_full_name}/issues?state=all&per_page=100', f"issues for {repo_full_name}")
+        if 'pull_request' not in issue
+    ]
+    return {
+        'open': [issue for issue in all_issues if issue['state'] == 'open'],
+        'closed': [issue for issue in all_issues if issue['state'] == 'closed']
+    }
+
+async def get_pull_requests(client, repo_full_name):
     """Get pull requests for a repository"""
-    all_prs = []
-    
-    # Get closed PRs
-    closed_prs = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/pulls?state=closed&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching closed PRs for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_prs = response.json()
-        if not current_prs:
-            break
-            
-        closed_prs.extend(current_prs)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-    
-    # Get open PRs
-    open_prs = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/pulls?state=open&per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching open PRs for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_prs = response.json()
-        if not current_prs:
-            break
-            
-        open_prs.extend(current_prs)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-        
-    all_prs = {'open': open_prs, 'closed': closed_prs}
-    return all_prs
-
-def get_commits(repo_full_name):
-    """Get commits for a repository"""
-    commits = []
-    page = 1
-    while True:
-        response = requests.get(
-            f'https://api.github.com/repos/{repo_full_name}/commits?per_page=100&page={page}',
-            headers=headers
-        )
-        if response.status_code != 200:
-            print(f"Error fetching commits for {repo_full_name}: {response.status_code}")
-            break
-            
-        current_commits = response.json()
-        if not current_commits:
-            break
-            
-        commits.extend(current_commits)
-        page += 1
-        
-        # Respect GitHub's rate limiting
-        time.sleep(1)
-        
-    return commits
+    # Open and closed PRs come in one sweep (state=all) and are split afterwards
+    all_prs = [
+        minimal_item(pr)
+        for pr in await get_all_pages(client, f'{GITHUB_API}/repos/{repo_full_name}/pulls?state=all&per_page=100', f"PRs for {repo_full_name}")
+    ]
+    return {
+        'open': [pr for pr in all_prs if pr['state'] == 'open'],
+        'closed': [pr for pr in all_prs if pr['state'] == 'closed']
+    }
 
-def check_file_exists(repo_full_name, file_path):
-    """Check if a file exists in a repository"""
-    response = requests.get(
-        f'https://api.github.com/repos/{repo_full_name}/contents/{file_path}',
-        headers=headers
+async def get_latest_commit(client, repo_full_name):
+    """Get the most recent commit of a repository and the number of commits, without listing every commit"""
+    response = await gh_get(
+        client,
+        f'{GITHUB_API}/repos/{repo_full_name}/commits?per_page=1'
     )
-    return response.status_code == 200
+    if response.status_code != 200:
+        print(f"Error fetching commits for {repo_full_name}: {response.status_code}")
+        return None, 0
+    commits = orjson.loads(response.content)
+    # Commits are returned newest first
+    return (commits[0] if commits else None), count_from_last_page(response, commits)
 
-def get_workflows(repo_full_name):
-    """Check if the repository has GitHub Actions workflows"""
-    response = requests.get(
-        f'https://api.github.com/repos/{repo_full_name}/actions/workflows',
-        headers=headers
+async def get_repo_tree(client, repo_full_name, default_branch):
+    """Get the paths of all files and directories on the default branch, in a single request"""
+    response = await gh_get(
+        client,
+        f'{GITHUB_API}/repos/{repo_full_name}/git/trees/{default_branch}?recursive=1'
     )
     if response.status_code != 200:
-        return []
-    return response.json().get('workflows', [])
+        # e.g. 409 for an empty repository
+        return set()
+    return {entry['path'] for entry in orjson.loads(response.content).get('tree', [])}
+
+async def fetch_repo_metrics_rest(client, repo):
+    """Get the issues, PRs, latest commit and documentation files of a repository with the REST API,
+       in the shape fetch_repo_metrics returns
+    """
+    repo_full_name = repo['full_name']
+    # The calls are independent of each other and run concurrently
+    issues, prs, (commit, total_commits), tree = await asyncio.gather(
+        get_issues(client, repo_full_name),
+        get_pull_requests(client, repo_full_name),
+        get_latest_commit(client, repo_full_name),
+        get_repo_tree(client, repo_full_name, repo['default_branch'])
+    )
+    return {
+        'open_issues': len(issues['open']),
+        'closed_issues': issues['closed'],
+        'prs': prs,
+        'last_commit_date': commit['commit']['committer']['date'] if commit else None,
+        'total_commits': total_commits,
+        'has_readme': 'README.md' in tree,
+        'has_license': 'LICENSE' in tree,
+        'has_contributing': 'CONTRIBUTING.md' in tree,
+        # GitHub Actions workflows
+        'has_cicd': any(path.startswith('.github/workflows/') for path in tree)
+    }
+
+# Everything the metrics need from a repository (except its contributors, which GraphQL does not offer).
+# Closed issues and PRs come 100 at a time; follow-up pages only ask for the connections that have more.
+REPO_QUERY = """
+query($owner: String!, $name: String!, $withSummary: Boolean!, $withIssues: Boolean!, $withPrs: Boolean!,
+      $issuesAfter: String, $prsAfter: String) {
+  repository(owner: $owner, name: $name) {
+    openIssues: issues(states: OPEN) @include(if: $withSummary) { totalCount }
+    closedIssues: issues(states: CLOSED, first: 100, after: $issuesAfter) @include(if: $withIssues) {
+      pageInfo { hasNextPage endCursor }
+      nodes { createdAt closedAt }
+    }
+    pullRequests(first: 100, after: $prsAfter) @include(if: $withPrs) {
+      pageInfo { hasNextPage endCursor }
+      nodes { state author { login } }
+    }
+    defaultBranchRef @include(if: $withSummary) {
+      target { ... on Commit { history(first: 1) { totalCount nodes { committedDate } } } }
+    }
+    readme: object(expression: "HEAD:README.md") @include(if: $withSummary) { id }
+    license: object(expression: "HEAD:LICENSE") @include(if: $withSummary) { id }
+    contributing: object(expression: "HEAD:CONTRIBUTING.md") @include(if: $withSummary) { id }
+    workflows: object(expression: "HEAD:.github/workflows") @include(if: $withSummary) {
+      ... on Tree { entries { name } }
+    }
+  }
+}
+"""
+
+async def gh_graphql(client, query, variables):
+    """Run a GitHub GraphQL (v4) query, returns its data or None if it failed"""
+    response = await gh_request(client, 'POST', f'{GITHUB_API}/graphql', json={'query': query, 'variables': variables})
+    if response.status_code != 200:
+        return None
+    result = orjson.loads(response.content)
+    if result.get('errors') or not result.get('data'):
+        return None
+    return result['data']
+
+async def fetch_repo_metrics(client, repo):
+    """Get the issues, PRs, latest commit and documentation files of a repository with GitHub's GraphQL API,
+       a single query for most repositories instead of one REST call per endpoint
+    """
+    repo_full_name = repo['full_name']
+    owner, name = repo_full_name.split('/')
+    variables = {
+        'owner': owner, 'name': name,
+        'withSummary': True, 'withIssues': True, 'withPrs': True,
+        'issuesAfter': None, 'prsAfter': None
+    }
+    summary = None
+    closed_issues = []
+    prs = {'open': [], 'closed': []}
+    while variables['withIssues'] or variables['withPrs']:
+        data = await gh_graphql(client, REPO_QUERY, variables)
+        if data is None or data.get('repository') is None:
+            # Fall back to the REST API for this repository
+            print(f"Error fetching {repo_full_name} with GraphQL, using the REST API")
+            return await fetch_repo_metrics_rest(client, repo)
+        repository = data['repository']
+        if summary is None:
+            summary = repository
+            variables['withSummary'] = False
+
+        if variables['withIssues']:
+            connection = repository['closedIssues']
+            closed_issues.extend({'created_at': node['createdAt'], 'closed_at': node['closedAt']} for node in connection['nodes'])
+            variables['withIssues'] = connection['pageInfo']['hasNextPage']
+            variables['issuesAfter'] = connection['pageInfo']['endCursor']
+
+        if variables['withPrs']:
+            connection = repository['pullRequests']
+            for node in connection['nodes']:
+                # Merged PRs are closed ones too, like in the REST API
+                state = 'open' if node['state'] == 'OPEN' else 'closed'
+                prs[state].append({'state': state, 'user': {'login': (node['author'] or {}).get('login')}})
+            variables['withPrs'] = connection['pageInfo']['hasNextPage']
+            variables['prsAfter'] = connection['pageInfo']['endCursor']
+
+    # Empty repositories have no default branch
+    history = ((summary['defaultBranchRef'] or {}).get('target') or {}).get('history') or {'totalCount': 0, 'nodes': []}
+    return {
+        'open_issues': summary['openIssues']['totalCount'],
+        'closed_issues': closed_issues,
+        'prs': prs,
+        'last_commit_date': history['nodes'][0]['committedDate'] if history['nodes'] else None,
+        'total_commits': history['totalCount'],
+        'has_readme': summary['readme'] is not None,
+        'has_license': summary['license'] is not None,
+        'has_contributing': summary['contributing'] is not None,
+        'has_cicd': bool((summary['workflows'] or {}).get('entries'))
+    }
+
+async def fetch_repo_data(client, repo):
+    """Get everything the metrics of a repository need, its API calls run concurrently"""
+    # The GraphQL API needs a token
+    fetch_metrics = fetch_repo_metrics if TOKEN else fetch_repo_metrics_rest
+    num_contributors, repo_data = await asyncio.gather(
+        get_contributor_count(client, repo['full_name']),
+        fetch_metrics(client, repo)
+    )
+    return {**repo_data, 'num_contributors': num_contributors}
 
-def calculate_metrics(repos, org_name, gov_id):
+async def calculate_metrics(client, repos, org_name, gov_id):
     """Calculate sustainability metrics for each repository"""
-    metrics = []
     current_date = datetime.datetime.now()
+    # All repositories are fetched concurrently, the request semaphore keeps the load on GitHub bounded
+    repo_data = await tqdm.gather(
+        *(fetch_repo_data(client, repo) for repo in repos),
+        desc=f"Processing {org_name} repositories"
+    )
+    return [repo_metrics_from(repo, data, org_name, gov_id, current_date) for repo, data in zip(repos, repo_data)]
+
+def repo_metrics_from(repo, repo_data, org_name, gov_id, current_date):
+    """Calculate the sustainability metrics of one repository from its API data"""
+    repo_full_name = repo['full_name']
+    repo_created_at = parse_github_date(repo['created_at'])
+    repo_age_days = (current_date - repo_created_at).days
+    repo_age_months = repo_age_days / 30.44  # Average days in a month
     
-    for repo in tqdm(repos, desc=f"Processing {org_name} repositories"):
-        repo_full_name = repo['full_name']
-        repo_created_at = datetime.datetime.strptime(repo['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-        repo_age_days = (current_date - repo_created_at).days
-        repo_age_months = repo_age_days / 30.44  # Average days in a month
-        
-        # Get additional data
-        contributors = get_contributors(repo_full_name)
-        issues = get_issues(repo_full_name)
-        prs = get_pull_requests(repo_full_name)
-        commits = get_commits(repo_full_name)
-        
-        # Calculate issue resolution time
-        issue_resolution_times = []
-        for issue in issues['closed']:
-            if 'created_at' in issue and 'closed_at' in issue:
-                created_at = datetime.datetime.strptime(issue['created_at'], '%Y-%m-%dT%H:%M:%SZ')
-                closed_at = datetime.datetime.strptime(issue['closed_at'], '%Y-%m-%dT%H:%M:%SZ')
-                resolution_time = (closed_at - created_at).total_seconds() / 3600  # in hours
-                issue_resolution_times.append(resolution_time)
-        
-        avg_issue_resolution_time = sum(issue_resolution_times) / len(issue_resolution_times) if issue_resolution_times else None
-        
-        # Calculate last commit date
-        last_commit_date = None
-        last_commit_age = None
-        if commits:
-            last_commit_date_str = commits[0]['commit']['committer']['date']
-            last_commit_date = datetime.datetime.strptime(last_commit_date_str, '%Y-%m-%dT%H:%M:%SZ')
-            last_commit_age = (current_date - last_commit_date).days
-        
-        # Check for documentation files
-        has_readme = check_file_exists(repo_full_name, 'README.md')
-        has_license = check_file_exists(repo_full_name, 'LICENSE')
-        has_contributing = check_file_exists(repo_full_name, 'CONTRIBUTING.md')
-        
-        # Check for CI/CD
-        has_cicd = len(get_workflows(repo_full_name)) > 0
+    num_contributors = repo_data['num_contributors']
+    prs = repo_data['prs']
+    # Counts used by several metrics
+    n_open_issues = repo_data['open_issues']
+    n_closed_issues = len(repo_data['closed_issues'])
+    n_total_issues = n_open_issues + n_closed_issues
+    n_open_prs = len(prs['open'])
+    n_closed_prs = len(prs['closed'])
+    n_total_prs = n_open_prs + n_closed_prs
+    total_commits = repo_data['total_commits']
+    
+    # Calculate issue resolution time (in hours), parsing each date column at once
+    closed_issues = pd.DataFrame(repo_data['closed_issues'], columns=['created_at', 'closed_at']).dropna()
+    issue_resolution_times = (
+        pd.to_datetime(closed_issues['closed_at'], format='%Y-%m-%dT%H:%M:%SZ')
+        - pd.to_datetime(closed_issues['created_at'], format='%Y-%m-%dT%H:%M:%SZ')
+    ).dt.total_seconds() / 3600
+    
+    avg_issue_resolution_time = issue_resolution_times.mean() if not issue_resolution_times.empty else None
+    
+    # Calculate last commit date
+    last_commit_date = None
+    last_commit_age = None
+    if repo_data['last_commit_date']:
+        last_commit_date = parse_github_date(repo_data['last_commit_date'])
+        last_commit_age = (current_date - last_commit_date).days
+    
+    # Calculate percentage of external contributions
+    owner_login = repo_full_name.split('/')[0]
+    external_prs = sum(1 for state in ('closed', 'open') for pr in prs[state] if pr['user']['login'] != owner_login)
+    external_pr_percentage = external_prs / n_total_prs * 100 if n_total_prs > 0 else 0
+    
+    # Gather metrics
+    repo_metrics = {
+        'government': gov_id,
+        'org_name': org_name,
+        'repo_name': repo['name'],
+        'repo_full_name': repo_full_name,
         
-        # Calculate percentage of external contributions
-        owner_login = repo_full_name.split('/')[0]
-        external_prs = [pr for pr in prs['closed'] + prs['open'] if pr['user']['login'] != owner_login]
-        external_pr_percentage = len(external_prs) / len(prs['closed'] + prs['open']) * 100 if len(prs['closed'] + prs['open']) > 0 else 0
+        # Activity & Maintenance Metrics
+        'repo_age_days': repo_age_days,
+        'repo_age_months': repo_age_months,
+        'commit_frequency_per_month': total_commits / repo_age_months if repo_age_months > 0 else 0,
+        'avg_issue_resolution_time_hours': avg_issue_resolution_time,
+        'open_issues_percentage': n_open_issues / n_total_issues * 100 if n_total_issues > 0 else 0,
+        'last_commit_date': last_commit_date,
+        'days_since_last_commit': last_commit_age,
         
-        # Gather metrics
-        repo_metrics = {
-            'government': gov_id,
-            'org_name': org_name,
-            'repo_name': repo['name'],
-            'repo_full_name': repo_full_name,
-            
-            # Activity & Maintenance Metrics
-            'repo_age_days': repo_age_days,
-            'repo_age_months': repo_age_months,
-            'commit_frequency_per_month': len(commits) / repo_age_months if repo_age_months > 0 else 0,
-            'avg_issue_resolution_time_hours': avg_issue_resolution_time,
-            'open_issues_percentage': len(issues['open']) / (len(issues['open']) + len(issues['closed'])) * 100 if (len(issues['open']) + len(issues['closed'])) > 0 else 0,
-            'last_commit_date': last_commit_date,
-            'days_since_last_commit': last_commit_age,
-            
-            # Collaboration & Community Engagement
-            'num_contributors': len(contributors),
-            'num_forks': repo['forks_count'],
-            'num_stars': repo['stargazers_count'],
-            'merged_pr_percentage': len(prs['closed']) / (len(prs['closed']) + len(prs['open'])) * 100 if (len(prs['closed']) + len(prs['open'])) > 0 else 0,
-            'external_pr_percentage': external_pr_percentage,
-            
-            # Code & Documentation Quality
-            'has_readme': has_readme,
-            'has_license': has_license,
-            'has_contributing': has_contributing,
-            'has_cicd': has_cicd,
-            
-            # Raw counts for reference
-            'total_commits': len(commits),
-            'open_issues': len(issues['open']),
-            'closed_issues': len(issues['closed']),
-            'open_prs': len(prs['open']),
-            'closed_prs': len(prs['closed'])
-        }
+        # Collaboration & Community Engagement
+        'num_contributors': num_contributors,
+        'num_forks': repo['forks_count'],
+        'num_stars': repo['stargazers_count'],
+        'merged_pr_percentage': n_closed_prs / n_total_prs * 100 if n_total_prs > 0 else 0,
+        'external_pr_percentage': external_pr_percentage,
         
-        metrics.append(repo_metrics)
+        # Code & Documentation Quality
+        'has_readme': repo_data['has_readme'],
+        'has_license': repo_data['has_license'],
+        'has_contributing': repo_data['has_contributing'],
+        'has_cicd': repo_data['has_cicd'],
         
-    return metrics
+        # Raw counts for reference
+        'total_commits': total_commits,
+        'open_issues': n_open_issues,
+        'closed_issues': n_closed_issues,
+        'open_prs': n_open_prs,
+        'closed_prs': n_closed_prs
+    }
+    
+    return repo_metrics
 
 def load_existing_metrics(file_path):
     """Load existing metrics from a CSV file if it exists"""
@@ -312,48 +465,33 @@ def load_existing_metrics(file_path):
     return None
 
 def save_metrics(metrics, file_path):
-    """Append new metrics to the existing CSV file instead of overwriting"""
+    """Append new metrics to the existing CSV file instead of overwriting.
+       Rows of repositories that were scraped before are replaced once all organizations are done (dedupe_metrics).
+    """
     new_df = pd.DataFrame(metrics)
+    # Only a new file gets the header row
+    new_df.to_csv(file_path, mode='a', header=not os.path.exists(file_path), index=False)
+    return len(new_df)
 
-    # If the file exists, append data without overwriting
-    if os.path.exists(file_path):
-        existing_df = pd.read_csv(file_path)
-        combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-        combined_df.drop_duplicates(subset=['repo_full_name', 'government'], keep='last', inplace=True)
-        combined_df.to_csv(file_path, index=False)
-    else:
-        # If the file doesn’t exist, create it
-        new_df.to_csv(file_path, index=False)
-
-    return len(new_df), len(new_df) 
-
-    # """Save metrics to a CSV file"""
-    # # Create DataFrame from new metrics
-    # new_df = pd.DataFrame(metrics)
-    
-    # # Check if file already exists and load it
-    # existing_df = load_existing_metrics(file_path)
-    
-    # if existing_df is not None:
-    #     # Combine existing and new data
-    #     combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-    #     # Remove duplicates based on repo_full_name and government
-    #     combined_df = combined_df.drop_duplicates(subset=['repo_full_name', 'government'], keep='last')
-    #     combined_df.to_csv(file_path, index=False)
-    #     return len(new_df), len(combined_df)
-    # else:
-    #     # If file doesn't exist, just save the new data
-    #     new_df.to_csv(file_path, index=False)
-    #     return len(new_df), len(new_df)
-
-def process_organization(org_name, gov_id, output_file):
+def dedupe_metrics(file_path):
+    """Keep only the latest metrics of each repository in the CSV file"""
+    existing_df = load_existing_metrics(file_path)
+    if existing_df is None:
+        return 0
+    duplicated = existing_df.duplicated(subset=['repo_full_name', 'government'], keep='last')
+    if duplicated.any():
+        existing_df = existing_df[~duplicated]
+        existing_df.to_csv(file_path, index=False)
+    return len(existing_df)
+
+async def process_organization(client, org_name, gov_id, output_file):
     """Process a single organization and add to the combined dataset"""
     print(f"Fetching repositories for {org_name}...")
-    repos = get_repos(org_name)
+    repos = await get_repos(client, org_name)
     print(f"Found {len(repos)} repositories.")
     
     print(f"Calculating sustainability metrics for {org_name}...")
-    metrics = calculate_metrics(repos, org_name, gov_id)
+    metrics = await calculate_metrics(client, repos, org_name, gov_id)
     
     # Create data directory if it doesn't exist
     if not os.path.exists('data'):
@@ -361,12 +499,12 @@ def process_organization(org_name, gov_id, output_file):
         print("Created 'data' directory")
     
     # Save metrics to the combined file
-    new_count, total_count = save_metrics(metrics, output_file)
-    print(f"Added {new_count} repositories from {org_name} to dataset. Total repositories: {total_count}")
+    new_count = save_metrics(metrics, output_file)
+    print(f"Added {new_count} repositories from {org_name} to dataset.")
     
     return metrics
 
-def main():
+async def main():
     """Main function to process organizations"""
     # Define output file path
     output_file = "data/government_repos_sustainability_metrics.csv"
@@ -386,11 +524,16 @@ def main():
         #["govgr", "greece"]              
     ]
     
-    # Process each organization
-    for org_name, gov_id in organizations:
-        process_organization(org_name, gov_id, output_file)
-    
-    print(f"All metrics saved to {output_file}")
+    # Process each organization (the client is closed once all organizations are done)
+    async with create_client() as client:
+        for org_name, gov_id in organizations:
+            await process_organization(client, org_name, gov_id, output_file)
+
+    save_http_cache()
+
+    # Metrics of repositories that were scraped again replace the old ones
+    total_count = dedupe_metrics(output_file)
+    print(f"All metrics saved to {output_file}. Total repositories: {total_count}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -6,14 +6,32 @@ from pathlib import Path
 import pandas as pd
 import requests
 import tempfile
+import io
 import subprocess
 import shutil
 from google import genai
+from google.genai import types
+import httpx
 from tqdm import tqdm
 import re
 import json
-from collections import Counter
-import networkx as nx
+import orjson
+import hashlib
+from collections import Counter, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+import mmap
+import operator
+import ast
+import tokenize
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+from radon.cli.tools import iter_filenames
+from radon.metrics import h_visit_ast, mi_compute
+from radon.raw import analyze
+from radon.visitors import ComplexityVisitor
 from datetime import datetime
 
 # Configuration
@@ -27,7 +45,18 @@ headers = {
 }
 
 # Configure Gemini
-client = genai.Client(api_key=GEMINI_API_KEY)
+# Gemini requests of all the repositories being analyzed, at most 8 at once
+GEMINI_MAX_REQUESTS = 8
+GEMINI_REQUESTS = ThreadPoolExecutor(max_workers=GEMINI_MAX_REQUESTS)
+# The client keeps one connection per concurrent request open between repositories. httpx's default
+# keepalive of 5 seconds is shorter than the analysis of a repository, so every request paid for a new
+# TLS handshake
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(client_args={
+        'limits': httpx.Limits(max_connections=GEMINI_MAX_REQUESTS, max_keepalive_connections=GEMINI_MAX_REQUESTS, keepalive_expiry=120)
+    })
+)
 
 # Technical sustainability patterns to look for (from SusAF)
 SUSTAINABLE_PATTERNS = {
@@ -207,42 +236,294 @@ SOCIAL_INDICATORS = {
     ]
 }
 
+# Categories whose patterns are searched in a single pass, as one alternation. This only gives the same
+# counts when no two patterns can match overlapping text: the naming patterns both match whole words only,
+# of disjoint character sets. Other categories overlap (e.g. 'import\s+' inside 'from x import').
+FUSED_CATEGORIES = {'naming_issues'}
+
+def required_literal(pattern):
+    """Longest run of plain characters that every match of a compiled pattern contains, or None.
+       Only the top level of the pattern is looked at: alternatives, groups and repeats end a run.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    longest, run = b'', bytearray()
+    for op, value in sre_parse.parse(pattern.pattern, pattern.flags):
+        if op == sre_parse.LITERAL:
+            run.append(value)
+            continue
+        longest = max(longest, bytes(run), key=len)
+        run.clear()
+    longest = max(longest, bytes(run), key=len)
+    return longest or None
+
+def block_delimiters(pattern):
+    """(opening, closing) literals of a pattern of the form opening[\s\S]*?closing (a docstring or comment block),
+       or None for any other pattern
+    """
+    items = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    lazy_repeats = [i for i, (op, _) in enumerate(items) if op == sre_parse.MIN_REPEAT]
+    if len(lazy_repeats) != 1:
+        return None
+    i = lazy_repeats[0]
+    low, high, body = items[i][1]
+    anything = [(sre_parse.IN, [(sre_parse.CATEGORY, sre_parse.CATEGORY_SPACE), (sre_parse.CATEGORY, sre_parse.CATEGORY_NOT_SPACE)])]
+    opening, closing = items[:i], items[i + 1:]
+    if low != 0 or high != sre_parse.MAXREPEAT or list(body) != anything or not opening or not closing:
+        return None
+    if any(op != sre_parse.LITERAL for op, _ in opening + closing):
+        return None
+    return bytes(value for _, value in opening), bytes(value for _, value in closing)
+
+def compile_patterns(patterns):
+    """Compile every regex of a pattern dict as a bytes pattern, keeping its categories.
+       Each pattern comes as (pattern, required literal, minimum match length, block delimiters),
+       see count_pattern.
+    """
+    compiled = {}
+    for category, category_patterns in patterns.items():
+        if category in FUSED_CATEGORIES:
+            category_compiled = [re.compile('|'.join(f'(?:{pattern})' for pattern in category_patterns).encode())]
+        else:
+            category_compiled = [re.compile(pattern.encode()) for pattern in category_patterns]
+        compiled[category] = [
+            (pattern, required_literal(pattern), sre_parse.parse(pattern.pattern, pattern.flags).getwidth()[0],
+             block_delimiters(pattern))
+            for pattern in category_compiled
+        ]
+    return compiled
+
+# Patterns are compiled once at import instead of being looked up in re's cache for every file.
+# They search the raw bytes of the files, so files are not decoded to str first.
+SUSTAINABLE_COMPILED = compile_patterns(SUSTAINABLE_PATTERNS)
+UNSUSTAINABLE_COMPILED = compile_patterns(UNSUSTAINABLE_PATTERNS)
+ENVIRONMENTAL_COMPILED = compile_patterns(ENVIRONMENTAL_INDICATORS)
+SOCIAL_COMPILED = compile_patterns(SOCIAL_INDICATORS)
+
+# Every (result key, category, compiled patterns) in a fixed order, so a file's counts travel as a flat list
+PATTERN_CATEGORIES = [
+    (key, category, patterns)
+    for key, compiled_patterns in [('sustainable', SUSTAINABLE_COMPILED), ('unsustainable', UNSUSTAINABLE_COMPILED),
+                                   ('environmental', ENVIRONMENTAL_COMPILED), ('social', SOCIAL_COMPILED)]
+    for category, patterns in compiled_patterns.items()
+]
+
+# Lines starting a comment (#, //, /*, * or */ after leading whitespace), all found in one pass over a file
+COMMENT_PATTERN = re.compile(rb'^[^\S\n]*(?:#|//|/\*|\*)', re.MULTILINE)
+NEWLINE_PATTERN = re.compile(rb'\n')
+FUNCTION_PATTERN = re.compile(rb'(function\s+\w+|def\s+\w+)')
+CLASS_PATTERN = re.compile(rb'(class\s+\w+)')
+
+# Analyses are cached on disk by commit SHA, so a repository that has not changed since an earlier run
+# is not cloned and analyzed again (which includes a Gemini call)
+ANALYSIS_CACHE_FILE = ".analysis_cache.json"
+# Cached analyses are only reused by the same version of this script
+with open(__file__, 'rb') as f:
+    ANALYSIS_VERSION = hashlib.sha256(f.read()).hexdigest()[:16]
+
+def load_cache(cache_file):
+    """Load an on-disk cache, or start with an empty one"""
+    try:
+        with open(cache_file, 'rb') as f:
+            return orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+
+def save_cache(cache, cache_file):
+    """Persist a cache for the next run"""
+    with open(cache_file, 'wb') as f:
+        # A copy, as repositories still being analyzed can add entries meanwhile
+        f.write(orjson.dumps(dict(cache)))
+
+ANALYSIS_CACHE = load_cache(ANALYSIS_CACHE_FILE)
+
+# Gemini scores by hash of the prompt: the same code sample is not sent again, even after this script
+# changed (which invalidates ANALYSIS_CACHE) or when a new commit did not touch the sampled files
+GEMINI_CACHE_FILE = ".gemini_cache.json"
+GEMINI_CACHE = load_cache(GEMINI_CACHE_FILE)
+# The JSON object in a Gemini answer, which may come with text or a code fence around it
+GEMINI_JSON_PATTERN = re.compile(r'\{.*\}', re.DOTALL)
+
+# Git fails instead of waiting for credentials when a repository is private or gone
+GIT_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+def remote_head(repo_url):
+    """Get the commit SHA a repository's HEAD points to without cloning it, or None if unknown"""
+    try:
+        result = subprocess.run(["git", "ls-remote", repo_url, "HEAD"],
+                                capture_output=True, text=True, check=True, env=GIT_ENV)
+    except subprocess.CalledProcessError:
+        return None
+    return result.stdout.split()[0] if result.stdout.strip() else None
+
+def local_head(repo_dir):
+    """Get the commit SHA of a checkout, or None if it has uncommitted changes (its analysis is not cacheable)"""
+    try:
+        head = subprocess.run(["git", "-C", repo_dir, "rev-parse", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "-C", repo_dir, "status", "--porcelain"],
+                                capture_output=True, text=True, check=True).stdout
+    except subprocess.CalledProcessError:
+        return None
+    return None if status.strip() else head
+
 def clone_repo(repo_url, target_dir):
     """Clone a GitHub repository to a local directory"""
     try:
-        subprocess.run(["git", "clone", repo_url, target_dir], 
-                      check=True, capture_output=True)
+        # Only the default branch, with its full history (for analyze_commit_history) but without the
+        # contents of old file versions: those are fetched by git only if something needs them
+        subprocess.run(["git", "clone", "--filter=blob:none", "--single-branch", "--no-tags", repo_url, target_dir],
+                      check=True, capture_output=True, env=GIT_ENV)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error cloning repository: {e}")
         return False
 
-def get_code_files(repo_dir, exclude_dirs=None):
-    """Get all relevant code files from the repository"""
+def iter_code_files(repo_dir, exclude_dirs=None):
+    """Yield the relevant code files of the repository, in the same order as os.walk would list them.
+       os.scandir gives the file type of each entry without an extra stat call, and nothing is
+       collected in a list.
+    """
     if exclude_dirs is None:
         exclude_dirs = ['node_modules', '.git', 'vendor', '__pycache__', 'build', 'dist', 'venv', 'env', '.venv']
     
-    code_extensions = ['.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cs', '.go', '.rb', '.php', '.cpp', '.c', '.h', '.swift', '.kt', '.rs']
-    files = []
+    code_extensions = ('.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cs', '.go', '.rb', '.php', '.cpp', '.c', '.h', '.swift', '.kt', '.rs')
+    subdirs = []
     
-    for root, dirs, filenames in os.walk(repo_dir):
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        
-        for filename in filenames:
-            if any(filename.endswith(ext) for ext in code_extensions):
-                files.append(os.path.join(root, filename))
+    try:
+        with os.scandir(repo_dir) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Like os.walk, symlinked directories are not followed
+                    if entry.name not in exclude_dirs and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif entry.name.endswith(code_extensions):
+                    yield entry.path
+    except OSError:
+        # Unreadable directories are skipped, as os.walk does
+        return
     
-    return files
+    for subdir in subdirs:
+        yield from iter_code_files(subdir, exclude_dirs)
+
+def read_file_bytes(file_path):
+    """Read a whole file as bytes, returns None if it could not be read"""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+def read_ahead(read, paths, window=16):
+    """Yield (path, read(path)) for every path in order, while a pool of threads already reads the next ones.
+       At most window reads run ahead, so a consumer stopping early does not leave the whole list being read.
+    """
+    io_pool = ThreadPoolExecutor(max_workers=window)
+    pending = deque()
+    try:
+        for path in paths:
+            pending.append((path, io_pool.submit(read, path)))
+            if len(pending) >= window:
+                path, read_result = pending.popleft()
+                yield path, read_result.result()
+        while pending:
+            path, read_result = pending.popleft()
+            yield path, read_result.result()
+    finally:
+        io_pool.shutdown(cancel_futures=True)
+
+def read_code_sample(file_path, max_chars):
+    """Read at most max_chars characters of a code file as text, returns None if it could not be read"""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read(max_chars)
+    except Exception as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+def count_pattern(compiled_pattern, content):
+    """Number of matches of a pattern from compile_patterns, with the cheapest way that gives the same count:
+       - files shorter than the shortest possible match, or without the pattern's required literal, have none
+         (finding a substring is much cheaper than running the regex, and most patterns do not occur in most files)
+       - blocks (docstrings, comment blocks) are counted with count_blocks
+    """
+    pattern, literal, min_length, delimiters = compiled_pattern
+    if len(content) < min_length:
+        return 0
+    if literal is not None and content.find(literal) == -1:
+        return 0
+    if delimiters:
+        return count_blocks(*delimiters, content)
+    return count_matches(pattern, content)
+
+def count_blocks(opening, closing, content):
+    """Number of matches of opening[\s\S]*?closing, by searching the delimiters directly.
+       The regex looks for the closing literal again from every opening one, which takes quadratic time
+       when a block is never closed (e.g. a truncated or generated file). Here an unclosed block ends the search:
+       no later block can be closed either.
+    """
+    count = 0
+    position = content.find(opening)
+    while position != -1:
+        end = content.find(closing, position + len(opening))
+        if end == -1:
+            break
+        count += 1
+        position = content.find(opening, end + len(closing))
+    return count
+
+def count_matches(pattern, content):
+    """Number of matches of a compiled pattern, without building a list of them
+       (the naming patterns alone match almost every word of a file)
+    """
+    return sum(1 for _ in pattern.finditer(content))
+
+def scan_file(file_path):
+    """Count the patterns and basic metrics of a single code file.
+       Runs in a worker process of analyze_code_patterns, returns None if the file could not be processed.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            # The file is memory-mapped instead of read into a str: no copy and no UTF-8 decoding.
+            # An empty file cannot be mapped.
+            with (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else nullcontext(b'')) as content:
+                file_result = {
+                    # Count lines (like str.split('\n'), the text after the last newline is a line too)
+                    'line_count': count_matches(NEWLINE_PATTERN, content) + 1,
+                    'file_size': file_size,
+                    # Count comment lines
+                    'comment_lines': count_matches(COMMENT_PATTERN, content),
+                    # Count functions and classes
+                    'function_count': count_matches(FUNCTION_PATTERN, content),
+                    'class_count': count_matches(CLASS_PATTERN, content),
+                    'ext': os.path.splitext(file_path)[1],
+                    # Matches of the sustainable and unsustainable patterns, environmental and social indicators,
+                    # in the order of PATTERN_CATEGORIES
+                    'pattern_counts': [sum(count_pattern(compiled_pattern, content) for compiled_pattern in patterns)
+                                       for _, _, patterns in PATTERN_CATEGORIES]
+                }
+                return file_result
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None
 
 def analyze_code_patterns(files):
-    """Analyze code files for sustainable and unsustainable patterns"""
+    """Analyze code files for sustainable and unsustainable patterns.
+       files can be any iterable of paths (e.g. iter_code_files), they are counted while being scanned.
+    """
     results = {
         'sustainable': {k: 0 for k in SUSTAINABLE_PATTERNS},
         'unsustainable': {k: 0 for k in UNSUSTAINABLE_PATTERNS},
         'environmental': {k: 0 for k in ENVIRONMENTAL_INDICATORS},
         'social': {k: 0 for k in SOCIAL_INDICATORS},
         'total_lines': 0,
-        'file_count': len(files),
+        'file_count': 0,
         'file_types': Counter(),
         'avg_file_size': 0,
         'function_count': 0,
@@ -252,72 +533,65 @@ def analyze_code_patterns(files):
     
     total_size = 0
     total_comment_lines = 0
+    pattern_totals = [0] * len(PATTERN_CATEGORIES)
+    file_types = results['file_types']
     
-    for file_path in files:
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # Count lines
-            lines = content.split('\n')
-            line_count = len(lines)
-            results['total_lines'] += line_count
-            
-            # Calculate file size
-            file_size = os.path.getsize(file_path)
-            total_size += file_size
-            
-            # Count comment lines
-            comment_patterns = [r'^\s*#', r'^\s*//', r'^\s*/\*', r'^\s*\*', r'^\s*\*/']
-            comment_lines = sum(1 for line in lines if any(re.match(pattern, line) for pattern in comment_patterns))
-            total_comment_lines += comment_lines
-            
-            # Count functions and classes
-            function_matches = len(re.findall(r'(function\s+\w+|def\s+\w+)', content))
-            class_matches = len(re.findall(r'(class\s+\w+)', content))
-            results['function_count'] += function_matches
-            results['class_count'] += class_matches
-            
-            # Count file types
-            ext = os.path.splitext(file_path)[1]
-            results['file_types'][ext] += 1
-            
-            # Check for sustainable patterns
-            for category, patterns in SUSTAINABLE_PATTERNS.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    results['sustainable'][category] += len(matches)
-            
-            # Check for unsustainable patterns
-            for category, patterns in UNSUSTAINABLE_PATTERNS.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    results['unsustainable'][category] += len(matches)
-            
-            # Check for environmental indicators
-            for category, patterns in ENVIRONMENTAL_INDICATORS.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    results['environmental'][category] += len(matches)
-            
-            # Check for social indicators
-            for category, patterns in SOCIAL_INDICATORS.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, content)
-                    results['social'][category] += len(matches)
-                    
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
+    # Files are independent of each other and scanning them is CPU bound (regex matching),
+    # so they are spread over one process per core. Chunks keep the inter-process overhead low.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for file_result in executor.map(scan_file, files, chunksize=32):
+            results['file_count'] += 1
+            if file_result is None:
+                continue
+            results['total_lines'] += file_result['line_count']
+            total_size += file_result['file_size']
+            total_comment_lines += file_result['comment_lines']
+            results['function_count'] += file_result['function_count']
+            results['class_count'] += file_result['class_count']
+            file_types[file_result['ext']] += 1
+            # Element-wise sum of the flat counts, instead of a dict update per category
+            pattern_totals = list(map(operator.add, pattern_totals, file_result['pattern_counts']))
+    
+    for (key, category, _), total in zip(PATTERN_CATEGORIES, pattern_totals):
+        results[key][category] = total
     
     # Calculate averages
-    if len(files) > 0:
-        results['avg_file_size'] = total_size / len(files)
+    if results['file_count'] > 0:
+        results['avg_file_size'] = total_size / results['file_count']
         
     if results['total_lines'] > 0:
         results['comment_ratio'] = total_comment_lines / results['total_lines']
     
     return results
 
+def radon_file_metrics(file_path):
+    """Complexity metrics of a single Python file with radon's API. The file is parsed once for all of them.
+       Runs in a worker process of calculate_cyclomatic_complexity, returns None if the file could not be parsed.
+    """
+    try:
+        # Decoded like radon does, from the encoding declared in the file (UTF-8 by default)
+        with tokenize.open(file_path) as f:
+            code = f.read()
+        tree = ast.parse(code)
+        complexity = ComplexityVisitor.from_ast(tree)
+        halstead = h_visit_ast(tree).total
+        
+        # Same as mi_visit(code, multi=True), without parsing the file twice more
+        raw = analyze(code)
+        comments = (raw.comments + raw.multi) / float(raw.sloc) * 100 if raw.sloc != 0 else 0
+        
+        return {
+            # Functions, classes and methods
+            'complexities': [block.complexity for block in complexity.blocks],
+            'maintainability_index': mi_compute(halstead.volume, complexity.total_complexity, raw.lloc, comments),
+            'volume': halstead.volume,
+            'difficulty': halstead.difficulty,
+            'effort': halstead.effort
+        }
+    except Exception:
+        # Like the radon command, files that do not parse (e.g. Python 2) are skipped
+        return None
+
 def calculate_cyclomatic_complexity(repo_dir):
     """Estimate cyclomatic complexity using radon for Python files"""
     complexity_data = {
@@ -333,99 +607,37 @@ def calculate_cyclomatic_complexity(repo_dir):
     }
     
     try:
-        # Check if radon is available
-        result = subprocess.run(["pip", "show", "radon"], capture_output=True, text=True)
-        if "not found" in result.stderr:
-            subprocess.run(["pip", "install", "radon"], check=True)
-        
-        # Run radon on Python files for cyclomatic complexity
-        result = subprocess.run(
-            ["radon", "cc", repo_dir, "--average", "--total-average", "-s"],
-            capture_output=True, text=True, check=True
-        )
-        
-        output = result.stdout
-        
-        # Parse average complexity
-        avg_match = re.search(r'Average complexity: ([0-9.]+)', output)
-        if avg_match:
-            complexity_data["average"] = float(avg_match.group(1))
-        
-        # Count functions with complexity > 10 (considered complex)
-        complex_count = output.count(" C ")  # Radon marks complex functions with C
-        complexity_data["complex_functions"] = complex_count
-        
-        # Find maximum complexity
-        max_pattern = re.compile(r'- ([A-Z]) \(([0-9]+)\)')
-        matches = max_pattern.findall(output)
-        if matches:
-            complexities = [int(m[1]) for m in matches]
-            if complexities:
-                complexity_data["max"] = max(complexities)
-        
-        # Run radon for maintainability index
-        result = subprocess.run(
-            ["radon", "mi", repo_dir, "-s"],
-            capture_output=True, text=True, check=True
-        )
+        complexities = []
+        mi_values = []
+        volume_values = []
+        difficulty_values = []
+        effort_values = []
         
-        output = result.stdout
+        # The Python files the radon command would pick (hidden directories and files are skipped),
+        # analyzed in worker processes like in analyze_code_patterns
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for file_metrics in executor.map(radon_file_metrics, iter_filenames([repo_dir]), chunksize=8):
+                if file_metrics is None:
+                    continue
+                complexities.extend(file_metrics['complexities'])
+                mi_values.append(file_metrics['maintainability_index'])
+                volume_values.append(file_metrics['volume'])
+                difficulty_values.append(file_metrics['difficulty'])
+                effort_values.append(file_metrics['effort'])
         
-        # Parse average maintainability index
-        mi_values = []
-        for line in output.splitlines():
-            if " - " in line:
-                try:
-                    mi_value = float(line.split(" - ")[1].strip())
-                    mi_values.append(mi_value)
-                except:
-                    pass
+        if complexities:
+            # Average over all blocks, like radon cc --total-average
+            complexity_data["average"] = sum(complexities) / len(complexities)
+            complexity_data["max"] = max(complexities)
+            # Count functions with complexity > 10 (considered complex, rank C or worse)
+            complexity_data["complex_functions"] = sum(1 for complexity in complexities if complexity > 10)
         
+        # Average maintainability index and Halstead metrics of the files
         if mi_values:
             complexity_data["maintainability_index"] = sum(mi_values) / len(mi_values)
-        
-        # Run radon for Halstead metrics (if available)
-        try:
-            result = subprocess.run(
-                ["radon", "hal", repo_dir],
-                capture_output=True, text=True, check=True
-            )
-            
-            output = result.stdout
-            
-            # Very basic parsing - would need more sophisticated parsing for real use
-            volume_values = []
-            difficulty_values = []
-            effort_values = []
-            
-            for line in output.splitlines():
-                if "h1:" in line and "h2:" in line:  # Line with Halstead metrics
-                    parts = line.split()
-                    for part in parts:
-                        if part.startswith("volume:"):
-                            try:
-                                volume_values.append(float(part.split(":")[1]))
-                            except:
-                                pass
-                        elif part.startswith("difficulty:"):
-                            try:
-                                difficulty_values.append(float(part.split(":")[1]))
-                            except:
-                                pass
-                        elif part.startswith("effort:"):
-                            try:
-                                effort_values.append(float(part.split(":")[1]))
-                            except:
-                                pass
-            
-            if volume_values:
-                complexity_data["halstead_metrics"]["volume"] = sum(volume_values) / len(volume_values)
-            if difficulty_values:
-                complexity_data["halstead_metrics"]["difficulty"] = sum(difficulty_values) / len(difficulty_values)
-            if effort_values:
-                complexity_data["halstead_metrics"]["effort"] = sum(effort_values) / len(effort_values)
-        except:
-            pass  # Halstead metrics might not be available
+            complexity_data["halstead_metrics"]["volume"] = sum(volume_values) / len(volume_values)
+            complexity_data["halstead_metrics"]["difficulty"] = sum(difficulty_values) / len(difficulty_values)
+            complexity_data["halstead_metrics"]["effort"] = sum(effort_values) / len(effort_values)
         
     except Exception as e:
         print(f"Error calculating complexity metrics: {e}")
@@ -472,18 +684,18 @@ def analyze_dependency_graph(repo_dir):
                         all_deps = lock_data["dependencies"]
                         dependency_data["dependency_graph"]["nodes"] = len(all_deps)
                         
-                        # Create a simple graph to count edges
-                        G = nx.DiGraph()
-                        for dep_name, dep_info in all_deps.items():
-                            G.add_node(dep_name)
-                            if "requires" in dep_info:
-                                for req_name in dep_info["requires"]:
-                                    G.add_edge(dep_name, req_name)
+                        # Count the edges of the dependency graph directly, no graph object is needed for that.
+                        # Each package requires a name at most once, and required packages missing from the
+                        # lock file are nodes of the graph too.
+                        edges = [(dep_name, req_name) for dep_name, dep_info in all_deps.items()
+                                 for req_name in dep_info.get("requires", ())]
+                        graph_nodes = set(all_deps)
+                        graph_nodes.update(req_name for _, req_name in edges)
                         
-                        dependency_data["dependency_graph"]["edges"] = G.number_of_edges()
+                        dependency_data["dependency_graph"]["edges"] = len(edges)
                         
-                        if G.number_of_nodes() > 0:
-                            dependency_data["dependency_graph"]["avg_degree"] = G.number_of_edges() / G.number_of_nodes()
+                        if graph_nodes:
+                            dependency_data["dependency_graph"]["avg_degree"] = len(edges) / len(graph_nodes)
                 except Exception as e:
                     print(f"Error analyzing package-lock.json: {e}")
         except Exception as e:
@@ -518,15 +730,16 @@ def check_test_coverage(repo_dir):
     # Look for test directories and files
     test_dirs = ['tests', 'test', '__tests__', 'spec', 'unit_tests', 'integration_tests', 'e2e']
     test_patterns = ['*_test.py', '*_spec.js', 'test_*.py', '*Test.java', '*Spec.js', '*_test.go', '*_test.rb']
-    test_frameworks = {
-        'pytest': r'import\s+pytest',
-        'jest': r'import\s+.*\s+from\s+[\'"]@testing-library',
-        'mocha': r'(describe|it)\s*\(',
-        'junit': r'import\s+.*\s+from\s+[\'"]junit',
-        'unittest': r'import\s+unittest',
-        'rspec': r'RSpec\.',
-        'go_test': r'func\s+Test\w+\('
-    }
+    # (framework, literal that every match contains, pattern): the pattern only runs on files containing the literal
+    test_frameworks = [
+        ('pytest', b'pytest', re.compile(rb'import\s+pytest')),
+        ('jest', b'@testing-library', re.compile(rb'import\s+.*\s+from\s+[\'"]@testing-library')),
+        ('mocha', b'(', re.compile(rb'(describe|it)\s*\(')),
+        ('junit', b'junit', re.compile(rb'import\s+.*\s+from\s+[\'"]junit')),
+        ('unittest', b'unittest', re.compile(rb'import\s+unittest')),
+        ('rspec', b'RSpec.', re.compile(rb'RSpec\.')),
+        ('go_test', b'Test', re.compile(rb'func\s+Test\w+\('))
+    ]
     
     test_files = []
     code_files = []
@@ -549,21 +762,23 @@ def check_test_coverage(repo_dir):
             
             if is_test_file:
                 test_files.append(file_path)
-                
-                # Count test lines and detect frameworks
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                        test_lines_count += len(content.split('\n'))
-                        
-                        # Detect test frameworks
-                        for framework, pattern in test_frameworks.items():
-                            if re.search(pattern, content):
-                                detected_frameworks.add(framework)
-                except Exception as e:
-                    print(f"Error reading test file {file_path}: {e}")
             else:
                 code_files.append(file_path)
+    
+    # Count test lines and detect frameworks. Reading many small files is mostly waiting on the file system,
+    # so the files are read by a pool of threads while they are scanned here in order.
+    with ThreadPoolExecutor(max_workers=8) as io_pool:
+        for content in io_pool.map(read_file_bytes, test_files):
+            if content is None:
+                continue
+            # Same count as splitting the text read in universal newlines mode
+            test_lines_count += content.count(b'\n') + content.count(b'\r') - content.count(b'\r\n') + 1
+            
+            # Detect test frameworks, until all of them have been found
+            if len(detected_frameworks) < len(test_frameworks):
+                for framework, literal, pattern in test_frameworks:
+                    if framework not in detected_frameworks and literal in content and pattern.search(content):
+                        detected_frameworks.add(framework)
 
     coverage_data["has_tests"] = len(test_files) > 0
     coverage_data["test_files"] = len(test_files)
@@ -602,75 +817,68 @@ def analyze_commit_history(repo_dir):
         "test_driven_commits": 0  # commits that include test changes
     }
     
+    # Good commit messages, as one pattern run over all the messages joined by newlines (one match per good message):
+    # conventional commits, messages starting with a capital letter, or at least 10 chars long
+    good_message_pattern = re.compile(
+        r'^(?:(?:feat|fix|docs|style|refactor|test|chore)(?:\(.+\))?:|[A-Z]|.{10})', re.MULTILINE
+    )
+    
     try:
-        # Get total commits count
-        result = subprocess.run(
-            ["git", "-C", repo_dir, "rev-list", "--count", "HEAD"],
-            capture_output=True, text=True, check=True
+        # A single git log gives everything: each commit starts with a record separator (\x1e)
+        # and its author email, date and subject (split by \x1f), followed by the files it changed.
+        # The output is read as it comes instead of being buffered whole. Renames are not detected:
+        # that compares file contents, which a clone from clone_repo would have to download first.
+        process = subprocess.Popen(
+            ["git", "-C", repo_dir, "log", "--format=%x1e%ae%x1f%ad%x1f%s", "--date=short", "--name-only", "--no-renames"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8', errors='replace'
         )
-        commit_data["total_commits"] = int(result.stdout.strip())
         
-        # Get commit dates for frequency
-        result = subprocess.run(
-            ["git", "-C", repo_dir, "log", "--format=%ad", "--date=short"],
-            capture_output=True, text=True, check=True
-        )
-        commit_dates = result.stdout.strip().split('\n')
-        unique_dates = set(commit_dates)
-        commit_data["active_days"] = len(unique_dates)
+        total_commits = 0
+        commit_emails = set()
+        commit_dates = set()
+        first_date = None
+        last_date = None
+        messages = []
+        test_commits = 0
+        is_test_commit = False
+        
+        with process:
+            for line in process.stdout:
+                line = line.rstrip('\n')
+                if line.startswith('\x1e'):
+                    email, date, message = line[1:].split('\x1f', 2)
+                    total_commits += 1
+                    commit_emails.add(email)
+                    commit_dates.add(date)
+                    # Commits are listed newest first
+                    if last_date is None:
+                        last_date = date
+                    first_date = date
+                    is_test_commit = False
+                    messages.append(message)
+                elif line and not is_test_commit and 'test' in line.lower():
+                    # The commit includes test files
+                    is_test_commit = True
+                    test_commits += 1
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+        
+        commit_data["total_commits"] = total_commits
+        commit_data["active_days"] = len(commit_dates)
+        commit_data["contributors"] = len(commit_emails)
         
         # Calculate commit frequency (commits per week)
         if commit_dates:
             try:
-                first_date = datetime.strptime(commit_dates[-1], "%Y-%m-%d")
-                last_date = datetime.strptime(commit_dates[0], "%Y-%m-%d")
-                days_diff = (last_date - first_date).days + 1
+                days_diff = (datetime.strptime(last_date, "%Y-%m-%d") - datetime.strptime(first_date, "%Y-%m-%d")).days + 1
                 weeks = max(1, days_diff / 7)
                 commit_data["commit_frequency"] = commit_data["total_commits"] / weeks
             except Exception as e:
                 print(f"Error calculating commit frequency: {e}")
         
-        # Get unique contributors
-        result = subprocess.run(
-            ["git", "-C", repo_dir, "log", "--format=%ae"],
-            capture_output=True, text=True, check=True
-        )
-        commit_emails = result.stdout.strip().split('\n')
-        commit_data["contributors"] = len(set(commit_emails))
-        
-        # Analyze commit message quality and test-driven commits
-        result = subprocess.run(
-            ["git", "-C", repo_dir, "log", "--format=%s", "--name-only"],
-            capture_output=True, text=True, check=True
-        )
-        commit_logs = result.stdout.strip().split('\n\n')
-        
-        # Patterns for good commit messages
-        good_message_patterns = [
-            r'^(feat|fix|docs|style|refactor|test|chore)(\(.+\))?:',  # Conventional commits
-            r'^[A-Z]',  # Starts with capital letter
-            r'.{10,}',  # At least 10 chars long
-        ]
-        
-        # Count good commit messages and test-driven commits
-        good_messages = 0
-        test_commits = 0
-        
-        for i in range(0, len(commit_logs), 2):
-            if i+1 < len(commit_logs):
-                message = commit_logs[i]
-                files = commit_logs[i+1].split('\n') if i+1 < len(commit_logs) else []
-                
-                # Check message quality
-                if any(re.search(pattern, message) for pattern in good_message_patterns):
-                    good_messages += 1
-                
-                # Check if commit includes test files
-                if any('test' in f.lower() for f in files):
-                    test_commits += 1
-        
         # Calculate commit message quality score (0-1)
         if commit_data["total_commits"] > 0:
+            good_messages = sum(1 for _ in good_message_pattern.finditer('\n'.join(messages)))
             commit_data["commit_message_quality"] = good_messages / commit_data["total_commits"]
             commit_data["test_driven_commits"] = test_commits
         
@@ -679,6 +887,22 @@ def analyze_commit_history(repo_dir):
     
     return commit_data
 
+def folder_depth(directory):
+    """Depth of the deepest folder under directory (0 if it has no subfolders).
+       Only folders are recursed into and no list of files is built, unlike with os.walk.
+       Symlinked folders are not followed and unreadable ones count as empty.
+    """
+    try:
+        with os.scandir(directory) as entries:
+            subdirs = [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return 0
+    
+    max_depth = 0
+    for subdir in subdirs:
+        max_depth = max(max_depth, folder_depth(subdir) + 1)
+    return max_depth
+
 def analyze_repo_structure(repo_dir):
     """Analyze the repository structure"""
     structure = {
@@ -696,51 +920,38 @@ def analyze_repo_structure(repo_dir):
         "architecture_score": 0  # Score for architecture quality
     }
     
+    # The repository root (and .github) is listed once, instead of a stat call for every file checked
+    present_files = {entry.name for entry in os.scandir(repo_dir)}
+    if ".github" in present_files:
+        try:
+            present_files.update(f".github/{entry.name}" for entry in os.scandir(os.path.join(repo_dir, ".github")))
+        except OSError:
+            pass
+    
     # Check for key files
-    structure["has_readme"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["README.md", "README", "readme.md"]
-    )
-    structure["has_license"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["LICENSE", "LICENSE.md", "license.txt"]
-    )
-    structure["has_gitignore"] = os.path.exists(os.path.join(repo_dir, ".gitignore"))
-    structure["has_docker"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["Dockerfile", "docker-compose.yml", ".dockerignore"]
-    )
+    structure["has_readme"] = any(f in present_files for f in ["README.md", "README", "readme.md"])
+    structure["has_license"] = any(f in present_files for f in ["LICENSE", "LICENSE.md", "license.txt"])
+    structure["has_gitignore"] = ".gitignore" in present_files
+    structure["has_docker"] = any(f in present_files for f in ["Dockerfile", "docker-compose.yml", ".dockerignore"])
     structure["has_contribution_guide"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["CONTRIBUTING.md", "CONTRIBUTE.md", ".github/CONTRIBUTING.md"]
-    )
-    structure["has_code_of_conduct"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["CODE_OF_CONDUCT.md", ".github/CODE_OF_CONDUCT.md"]
-    )
-    structure["has_security_policy"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["SECURITY.md", ".github/SECURITY.md", "security.md"]
+        f in present_files for f in ["CONTRIBUTING.md", "CONTRIBUTE.md", ".github/CONTRIBUTING.md"]
     )
+    structure["has_code_of_conduct"] = any(f in present_files for f in ["CODE_OF_CONDUCT.md", ".github/CODE_OF_CONDUCT.md"])
+    structure["has_security_policy"] = any(f in present_files for f in ["SECURITY.md", ".github/SECURITY.md", "security.md"])
     
-    # Check for CI configuration files
+    # Check for CI configuration files (or folders)
     ci_files = ['.travis.yml', '.github/workflows', 'circleci', 'jenkinsfile']
-    structure["has_ci_config"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) if os.path.isfile(os.path.join(repo_dir, f))
-        else os.path.isdir(os.path.join(repo_dir, f))
-        for f in ci_files
-    )
+    structure["has_ci_config"] = any(f in present_files for f in ci_files)
     
     # Check for dependency manager configuration
-    structure["has_dependency_manager"] = any(
-        os.path.exists(os.path.join(repo_dir, f)) for f in ["package.json", "requirements.txt", "Gemfile", "composer.json"]
-    )
+    dependency_files = ["package.json", "requirements.txt", "Gemfile", "composer.json"]
+    structure["has_dependency_manager"] = any(f in present_files for f in dependency_files)
     
     # Calculate folder depth (max depth)
-    max_depth = 0
-    for root, dirs, files in os.walk(repo_dir):
-        depth = root[len(repo_dir):].count(os.sep)
-        if depth > max_depth:
-            max_depth = depth
-    structure["folder_depth"] = max_depth
+    structure["folder_depth"] = folder_depth(repo_dir)
     
     # Count dependency files (as a simple dependency count)
-    dep_files = [f for f in os.listdir(repo_dir) if f in ["package.json", "requirements.txt", "Gemfile", "composer.json"]]
-    structure["dependency_count"] = len(dep_files)
+    structure["dependency_count"] = sum(1 for f in dependency_files if f in present_files)
     
     # Calculate a simple architecture score based on the presence of key files (normalized to 0-1)
     score = 0
@@ -784,35 +995,12 @@ def read_repo_links(csv_path):
         print(f"Error reading CSV file: {e}")
     return repos
 
-def derive_gemini_scores(repo_dir, files):
-    """
-    Use the Gemini 2.0 Flash model to analyze repository code and derive additional sustainability scores.
-    This function aggregates code samples (up to a maximum total character limit) and sends them
-    as context to the model. The model is then prompted to provide scores (0-100) on various dimensions.
-    """
-    code_samples = []
-    max_total_chars = 500000  # Set a limit to avoid huge payloads (adjust as needed)
-    total_chars = 0
-    for file in files:
-        try:
-            with open(file, 'r', encoding='utf-8', errors='ignore') as f:
-                code = f.read()
-            if total_chars + len(code) < max_total_chars:
-                code_samples.append(f"File: {file}\n{code}\n")
-                total_chars += len(code)
-            else:
-                # Stop adding if we've reached our maximum length
-                break
-        except Exception as e:
-            print(f"Error reading file {file}: {e}")
-    
-    aggregated_code = "\n".join(code_samples)
-    
-    prompt = f"""
+# Instructions of the Gemini prompt, which build_gemini_prompt follows with the code samples
+GEMINI_PROMPT_HEAD = """
 You are an expert code sustainability evaluator. Given the repository code samples, provide an evaluation with numerical scores (0-100) for the following metrics:
 
 Please respond ONLY with a JSON object with the following structure and no other text:
-{{
+{
   "overall_sustainability": [score],
   "documentation_quality": [score],
   "testing_robustness": [score],
@@ -824,40 +1012,104 @@ Please respond ONLY with a JSON object with the following structure and no other
   "social_inclusiveness": [score],
   "critical_issues": ["issue1", "issue2", ...],
   "improvement_suggestions": ["suggestion1", "suggestion2", ...]
-}}
+}
 
 Repository code:
-{aggregated_code}
 """
+
+def build_gemini_prompt(files):
+    """
+    Build the Gemini prompt of a repository: it aggregates code samples (up to a maximum total character limit)
+    as context, and asks for scores (0-100) on various dimensions.
+    """
+    # The prompt is written into one buffer, the instructions first and then the samples, without an
+    # intermediate copy of every file or of all the samples
+    prompt_buffer = io.StringIO()
+    prompt_buffer.write(GEMINI_PROMPT_HEAD)
+    sample_count = 0
+    max_total_chars = 500000  # Set a limit to avoid huge payloads (adjust as needed)
+    max_file_size = 100000  # Bigger files are mostly data or generated code, and would fill the limit alone
+    generated_markers = ('.min.', '.bundle.', '_pb2.py', '.pb.go', '.generated.', '.designer.cs')
+    total_chars = 0
+    
+    # Minified, generated and very large files are left out, and the files closest to the repository root
+    # come first (sorted keeps the walk order of files at the same depth), so the limit is filled with the
+    # code that tells the most about the repository
+    sampled_files = []
+    for file in files:
+        if any(marker in os.path.basename(file) for marker in generated_markers):
+            continue
+        try:
+            if os.path.getsize(file) > max_file_size:
+                continue
+        except OSError:
+            continue
+        sampled_files.append(file)
+    sampled_files.sort(key=lambda file: file.count(os.sep))
+    
+    # Files are read by a pool of threads ahead of the loop (see read_ahead). They are read up to the whole limit,
+    # as the space left for each one is only known when its turn comes
+    for file, code in read_ahead(lambda file: read_code_sample(file, max_total_chars), sampled_files):
+        if code is None:
+            continue
+        # A file only fits if it ends before the limit (a file longer than the limit was not read whole)
+        if total_chars + len(code) < max_total_chars:
+            # Samples are separated by an empty line
+            if sample_count:
+                prompt_buffer.write("\n")
+            prompt_buffer.write("File: ")
+            prompt_buffer.write(file)
+            prompt_buffer.write("\n")
+            prompt_buffer.write(code)
+            prompt_buffer.write("\n")
+            sample_count += 1
+            total_chars += len(code)
+        else:
+            # Stop adding if we've reached our maximum length
+            break
+    
+    # The prompt ends with a line break after the samples
+    prompt_buffer.write("\n")
+    return prompt_buffer.getvalue()
+
+def score_with_gemini(prompt):
+    """Send a prompt from build_gemini_prompt to the Gemini 2.0 Flash model and parse the scores it answers"""
+    prompt_key = hashlib.blake2b(prompt.encode('utf-8'), digest_size=16).hexdigest()
+    cached = GEMINI_CACHE.get(prompt_key)
+    if cached is not None:
+        return dict(cached)
+    
     try:
         # Call Gemini 2.0 Flash model (which supports a large context window)
         response = client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-        # Attempt to parse the response as JSON for structured output
+        # The JSON object is taken from the first '{' to the last '}', so it is parsed once whether or not
+        # the model wrapped it in a ```json fence
+        #print(f"Gemini response: {response.text}")
+        text = response.text
+        json_match = GEMINI_JSON_PATTERN.search(text)
         try:
-            #print(f"Gemini response: {response.text}")
-            gemini_scores = json.loads(response.text)
-        except Exception as parse_error:
+            gemini_scores = orjson.loads(json_match.group(0)) if json_match else {"raw_response": text}
+        except orjson.JSONDecodeError as parse_error:
             print(f"Error parsing Gemini response as JSON: {parse_error}")
-            # Try to extract JSON from the response text
-            print("Attempting to extract JSON from response text")
-            text = response.text
-            json_start = text.find('{')
-            json_end = text.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                try:
-                    json_str = text[json_start:json_end]
-                    gemini_scores = json.loads(json_str)
-                    print("Extracted JSON successfully")
-                except:
-                    gemini_scores = {"raw_response": text}
-            else:
-                gemini_scores = {"raw_response": text}
+            gemini_scores = {"raw_response": text}
     except Exception as e:
         print(f"Error calling Gemini model: {e}")
         gemini_scores = {"error": str(e)}
     
+    # Only scores are kept: a failed call or an answer that was not JSON is asked again next time
+    if "error" not in gemini_scores and "raw_response" not in gemini_scores:
+        GEMINI_CACHE[prompt_key] = dict(gemini_scores)
+    
     return gemini_scores
 
+def derive_gemini_scores(repo_dir, files):
+    """
+    Use the Gemini 2.0 Flash model to analyze repository code and derive additional sustainability scores.
+    This function aggregates code samples (up to a maximum total character limit) and sends them
+    as context to the model. The model is then prompted to provide scores (0-100) on various dimensions.
+    """
+    return score_with_gemini(build_gemini_prompt(files))
+
 def analyze_repository(repo_url, target_dir):
     """
     High-level function to analyze a repository.
@@ -870,21 +1122,38 @@ def analyze_repository(repo_url, target_dir):
       - Repository structure
       - Gemini-based sustainability scores
     """
+    # A repository analyzed before at the same commit is not cloned again
+    head = remote_head(repo_url)
+    cached = ANALYSIS_CACHE.get(f"{head}:{ANALYSIS_VERSION}") if head else None
+    if cached:
+        return dict(cached)
+    
     if clone_repo(repo_url, target_dir):
-        files = get_code_files(target_dir)
+        code_analysis = analyze_code_patterns(iter_code_files(target_dir))
         
         # Check if there are any code files
-        if not files:
+        if not code_analysis['file_count']:
             print(f"No code files found in repository: {repo_url}")
             return None
         
-        code_analysis = analyze_code_patterns(files)
-        complexity_analysis = calculate_cyclomatic_complexity(target_dir)
-        dependency_analysis = analyze_dependency_graph(target_dir)
-        test_coverage = check_test_coverage(target_dir)
-        commit_history = analyze_commit_history(target_dir)
-        repo_structure = analyze_repo_structure(target_dir)
-        gemini_scores = derive_gemini_scores(target_dir, files)
+        # The Gemini request runs while the other analyses are computed here
+        gemini_request = GEMINI_REQUESTS.submit(score_with_gemini, build_gemini_prompt(iter_code_files(target_dir)))
+        
+        # git log runs in its own process and the dependency, test and structure analyses mostly wait on the
+        # file system, so they run in threads meanwhile. The complexity analysis runs here, as it already
+        # keeps every core busy with its worker processes
+        with ThreadPoolExecutor(max_workers=4) as analyses:
+            commit_request = analyses.submit(analyze_commit_history, target_dir)
+            dependency_request = analyses.submit(analyze_dependency_graph, target_dir)
+            test_request = analyses.submit(check_test_coverage, target_dir)
+            structure_request = analyses.submit(analyze_repo_structure, target_dir)
+            complexity_analysis = calculate_cyclomatic_complexity(target_dir)
+        
+        dependency_analysis = dependency_request.result()
+        test_coverage = test_request.result()
+        commit_history = commit_request.result()
+        repo_structure = structure_request.result()
+        gemini_scores = gemini_request.result()
         
         overall_analysis = {
             "code_analysis": code_analysis,
@@ -896,13 +1165,42 @@ def analyze_repository(repo_url, target_dir):
             "gemini_scores": gemini_scores
         }
         
+        # Failed Gemini calls are retried in the next run instead of being cached
+        head = local_head(target_dir)
+        if head and "error" not in gemini_scores:
+            ANALYSIS_CACHE[f"{head}:{ANALYSIS_VERSION}"] = dict(overall_analysis)
+        
         return overall_analysis
     else:
         return None
 
+def analyze_listed_repository(repo_info, target_dir):
+    """Analyze a repository from the CSV cloned into target_dir, with the CSV metadata added.
+       The clone is removed afterwards. Runs in a worker thread of the main loop, returns None if the analysis failed.
+    """
+    print(f"Cloning repository to {target_dir}")
+    try:
+        # Analyze the repository
+        analysis = analyze_repository(repo_info['repo_link'], target_dir)
+    finally:
+        shutil.rmtree(target_dir, ignore_errors=True)
+    
+    if analysis:
+        # Add metadata from CSV
+        analysis['metadata'] = {
+            'country': repo_info['country'],
+            'org': repo_info['org'],
+            'repo_link': repo_info['repo_link']
+        }
+    return analysis
+
 if __name__ == "__main__":
     csv_path = "repo_links.csv"
     output_dir = "analysis_results"
+    max_repos_per_country = 30
+    # Most of a repository's analysis is spent waiting on git and the Gemini API,
+    # so several repositories are analyzed at once
+    max_parallel_repos = 4
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
@@ -911,53 +1209,79 @@ if __name__ == "__main__":
     repos = read_repo_links(csv_path)
     print(f"Found {len(repos)} repositories in CSV")
     
-    # Process each repository
-    results = []
+    # Process each repository. Analyses are not kept in memory: only the CSV rows of those that succeeded
+    analyzed = []
     country_repo_count = Counter()
     
+    # Repositories waiting to be analyzed per country, in CSV order
+    queued = defaultdict(deque)
     for i, repo_info in enumerate(repos):
-        country = repo_info['country']
-        
-        if country_repo_count[country] >= 30:
-            continue
+        queued[repo_info['country']].append((i, repo_info))
+    country_in_progress = Counter()
+    running = {}
+    
+    # One temporary directory for the whole run, with a folder per repository
+    with tempfile.TemporaryDirectory() as work_dir, ThreadPoolExecutor(max_workers=max_parallel_repos) as executor:
+        def submit_repos(country):
+            """Start as many repositories of a country as its quota still allows if they all succeed.
+               A failed one is replaced by the next of the country, as when they were analyzed one by one.
+            """
+            while queued[country] and country_repo_count[country] + country_in_progress[country] < max_repos_per_country:
+                i, repo_info = queued[country].popleft()
+                print(f"Processing repository {i+1}/{len(repos)}: {repo_info['repo_link']}")
+                target_dir = os.path.join(work_dir, f"repo_{i}")
+                running[executor.submit(analyze_listed_repository, repo_info, target_dir)] = (i, repo_info)
+                country_in_progress[country] += 1
         
-        print(f"Processing repository {i+1}/{len(repos)}: {repo_info['repo_link']}")
+        for country in list(queued):
+            submit_repos(country)
         
-        # Create a unique temporary directory for each repository
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            target_dir = os.path.join(tmp_dir, "repo")
-            print(f"Cloning repository to {target_dir}")
-            
-            # Analyze the repository
-            analysis = analyze_repository(repo_info['repo_link'], target_dir)
-            
-            if analysis:
-                # Add metadata from CSV
-                analysis['metadata'] = {
-                    'country': repo_info['country'],
-                    'org': repo_info['org'],
-                    'repo_link': repo_info['repo_link']
-                }
+        # Results are handled here in the main thread only, so the counters and files need no locking
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, repo_info = running.pop(future)
+                country = repo_info['country']
+                country_in_progress[country] -= 1
+                analysis = future.result()
                 
-                # Save individual result
-                repo_name = repo_info['repo_link'].split('/')[-1].replace('.git', '')
-                file_name = f"{repo_info['country']}_{repo_name}.json"
-                file_path = os.path.join(output_dir, file_name)
-                
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(analysis, f, indent=2)
-                
-                print(f"Analysis for {repo_info['repo_link']} saved to {file_path}")
+                if analysis:
+                    # Save individual result
+                    repo_name = repo_info['repo_link'].split('/')[-1].replace('.git', '')
+                    file_name = f"{repo_info['country']}_{repo_name}.json"
+                    file_path = os.path.join(output_dir, file_name)
+                    
+                    # orjson gives the same indented JSON as json.dumps(analysis, indent=2), several times faster
+                    analysis_json = orjson.dumps(analysis, option=orjson.OPT_INDENT_2)
+                    with open(file_path, 'wb') as f:
+                        f.write(analysis_json)
+                    
+                    print(f"Analysis for {repo_info['repo_link']} saved to {file_path}")
+                    
+                    # Also kept in the work directory for the combined results, as repositories of different
+                    # organizations can have the same file name
+                    with open(os.path.join(work_dir, f"result_{i}.json"), 'wb') as f:
+                        f.write(analysis_json)
+                    analyzed.append(i)
+                    country_repo_count[country] += 1
+                    
+                    # Saved after every repository, so an interrupted run keeps its progress
+                    save_cache(ANALYSIS_CACHE, ANALYSIS_CACHE_FILE)
+                    save_cache(GEMINI_CACHE, GEMINI_CACHE_FILE)
+                else:
+                    print(f"Failed to analyze repository: {repo_info['repo_link']}")
                 
-                # Add to results collection
-                results.append(analysis)
-                country_repo_count[country] += 1
-            else:
-                print(f"Failed to analyze repository: {repo_info['repo_link']}")
-    
-    # Save combined results
-    combined_file_path = os.path.join(output_dir, "all_results.json")
-    with open(combined_file_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+                submit_repos(country)
+        
+        # Save combined results, written one analysis at a time in CSV order
+        # (whatever order the analyses finished in)
+        combined_file_path = os.path.join(output_dir, "all_results.json")
+        with open(combined_file_path, 'wb') as combined:
+            combined.write(b'[')
+            for n, i in enumerate(sorted(analyzed)):
+                combined.write(b',\n' if n else b'\n')
+                with open(os.path.join(work_dir, f"result_{i}.json"), 'rb') as f:
+                    shutil.copyfileobj(f, combined)
+            combined.write(b'\n]' if analyzed else b']')
     
-    print(f"All analyses completed. Combined results saved to {combined_file_path}")
\ No newline at end of file
+    print(f"All analyses completed. Combined results saved to {combined_file_path}")